@@ -0,0 +1,71 @@
+"""
+对比 checkpoint 中间文件用 JSONL 与 frames（二进制帧）格式时的写入耗时、文件大小与重新读取耗时。
+重新读取即下游 stage 在 write-then-read 模式下要做的事：read_jsonl 完整解码每条记录。
+
+用法：
+    python benchmarks/bench_checkpoint_frames.py --n 100000
+    python benchmarks/bench_checkpoint_frames.py --path /mnt/pan8T/.../part1_video_check_crawl_in.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(common_utils_path)
+
+from bench_json_codec import make_record
+from common_utils import read_jsonl, save_jsonl
+
+FORMATS = [".json", ".frames", ".json.zst", ".frames.zst"]
+
+
+def _timeit(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _drain(path: str, **kwargs) -> int:
+    n = 0
+    for _ in read_jsonl(path, **kwargs):
+        n += 1
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--path", type=str, default=None, help="已有的 stage 输出（JSONL），不指定则生成记录")
+    parser.add_argument("--codec", type=str, default="auto")
+    args = parser.parse_args()
+
+    if args.path:
+        records = list(read_jsonl(args.path, codec=args.codec))
+    else:
+        records = [make_record(i) for i in range(args.n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"records={len(records)} codec={args.codec}")
+        print(f"{'format':<14}{'write(s)':>10}{'size(MB)':>10}{'read(s)':>10}{'read x':>8}")
+        base = None
+        for fmt in FORMATS:
+            path = os.path.join(tmp, "stage_out" + fmt)
+            t_write = _timeit(lambda: save_jsonl(records, path, overwrite=True, codec=args.codec), repeat=1)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            t_read = _timeit(lambda: _drain(path, codec=args.codec))
+            if base is None:
+                base = t_read
+            print(f"{fmt:<14}{t_write:>10.2f}{size_mb:>10.1f}{t_read:>10.2f}{base / t_read:>7.2f}x")
+        # JSONL 最快的读取路径作为参照
+        path = os.path.join(tmp, "stage_out.json")
+        t_read = _timeit(lambda: _drain(path, codec=args.codec, binary=True))
+        print(f"{'.json binary':<14}{'':>10}{'':>10}{t_read:>10.2f}{base / t_read:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+对比 remove_duplicates_interior 默认模式（str(tuple) 键）与 hash_keys=True（128 位摘要 + DigestSet）的峰值内存与耗时。
+每个 (模式, 记录数) 在独立子进程中运行，记录边生成边去重，不在内存中保留，
+峰值 RSS 减去去重开始前的 RSS 即为 seen 容器的开销。
+
+用法：
+    python benchmarks/bench_dedup_memory.py --n 1000000 10000000
+    python benchmarks/bench_dedup_memory.py --n 10000000 --modes hashed
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(common_utils_path)
+
+# 题干风格的长文本键，约 100 个字符
+_TEXT = "已知正方体$ABCD-A_1B_1C_1D_1$的棱长为{i}，点$P$在棱$AA_1$上，求三棱锥$P-BCD$的体积与表面积之比。"
+
+
+def _peak_rss_mb() -> float:
+    # Linux 下 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(n: int, mode: str) -> None:
+    from common_utils import remove_duplicates_interior
+
+    def samples():
+        for i in range(n):
+            # 约 10% 的重复
+            k = i if i % 10 else i // 10
+            yield {"topic_id": f"{k:012d}", "content": _TEXT.format(i=k)}
+
+    base = _peak_rss_mb()
+    t0 = time.perf_counter()
+    kept = 0
+    for _ in remove_duplicates_interior(samples(), [".topic_id", ".content"], hash_keys=(mode == "hashed")):
+        kept += 1
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({"kept": kept, "seconds": elapsed, "seen_mb": _peak_rss_mb() - base}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--modes", nargs="+", choices=["str", "hashed"], default=["str", "hashed"])
+    parser.add_argument("--child", choices=["str", "hashed"], default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.n[0], args.child)
+        return
+
+    print(f"{'records':>10}{'mode':>8}{'kept':>10}{'seconds':>10}{'seen(MB)':>10}{'B/key':>8}")
+    for n in args.n:
+        for mode in args.modes:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, "--n", str(n)],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                # 默认模式在大数据量下可能被 OOM kill
+                print(f"{n:>10}{mode:>8}{'failed (exit ' + str(proc.returncode) + ')':>38}")
+                continue
+            res = json.loads(proc.stdout.strip().splitlines()[-1])
+            per_key = res["seen_mb"] * 1024 * 1024 / res["kept"]
+            print(f"{n:>10}{mode:>8}{res['kept']:>10}{res['seconds']:>10.1f}{res['seen_mb']:>10.0f}{per_key:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+对比逐条 get_values_by_key_path 与 extract_paths（前缀树一次遍历）在路径数增加时的耗时。
+两组路径：
+  - flat：.topic_id / .video_content / .video_analyse.displayContent 这类纯字典路径
+  - nested：tran_script 解析后的 .scienceStruct.analyses[].xxx 这类共享 [] 前缀的路径
+
+用法：
+    python benchmarks/bench_extract_paths.py --n 20000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(common_utils_path)
+
+from bench_json_codec import make_record
+from common_utils import get_values_by_key_path, extract_paths
+
+FLAT_PATHS = [
+    ".topic_id",
+    ".video_content",
+    ".video_analyse.displayContent",
+    ".video_analyse.explainContent",
+    ".tran_script_operate_type",
+    ".score",
+]
+NESTED_PATHS = [
+    ".scienceStruct.analyses[].explainContent",
+    ".scienceStruct.analyses[].displayContent",
+    ".scienceStruct.standardAnswers[].explainContent",
+    ".scienceStruct.standardAnswers[].displayContent",
+    ".scienceStruct.analyses[0].displayContent",
+    ".scienceStruct.conclusion.displayContent",
+]
+
+
+def make_samples(n: int):
+    flat, nested = [], []
+    for i in range(n):
+        record = make_record(i)
+        record["video_content"] = record["topic_id"]
+        record["video_analyse"] = {"displayContent": "$x=1$", "explainContent": "解得"}
+        flat.append(record)
+        nested.append(json.loads(record["tran_script"][0]["tranScript"]))
+    return flat, nested
+
+
+def _timeit(fn, repeat: int = 5) -> float:
+    # 取多次中的最小值，并关闭 gc，减少结果列表分配带来的抖动
+    gc.disable()
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    args = parser.parse_args()
+
+    flat, nested = make_samples(args.n)
+    for name, samples, all_paths in (("flat", flat, FLAT_PATHS), ("nested", nested, NESTED_PATHS)):
+        print(f"[{name}] records={args.n}")
+        print(f"{'paths':>6}{'per-path(s)':>14}{'extract(s)':>12}{'speedup':>10}")
+        for k in range(1, len(all_paths) + 1):
+            paths = all_paths[:k]
+            t_each = _timeit(lambda: [[get_values_by_key_path(s, p) for p in paths] for s in samples])
+            t_trie = _timeit(lambda: [extract_paths(s, paths) for s in samples])
+            print(f"{k:>6}{t_each:>14.3f}{t_trie:>12.3f}{t_each / t_trie:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
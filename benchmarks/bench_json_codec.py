@@ -0,0 +1,79 @@
+"""
+对比不同 JSON 后端在 数学刷库 风格记录上的 read_jsonl / save_jsonl 耗时。
+
+用法：
+    python benchmarks/bench_json_codec.py --n 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(common_utils_path)
+
+from common_utils import read_jsonl, save_jsonl, available_codecs, get_codec
+
+
+def make_record(i: int) -> dict:
+    """
+    构造一条结构与 数学刷库 原始数据相近的记录：topic_id + 嵌套的 tran_script / preset_question，
+    其中 tranScript / presetQuestion 本身是 JSON 字符串。
+    """
+    rnd = random.Random(i)
+    step = lambda: {
+        "explainContent": "如图，在三棱锥$P-ABC$中，$PA\\perp$平面$ABC$，" * rnd.randint(1, 4),
+        "displayContent": "$V=\\frac{1}{3}Sh=\\frac{1}{3}\\times 6\\times 4=8$",
+    }
+    science_struct = {
+        "content": "已知正方体$ABCD-A_1B_1C_1D_1$的棱长为" + str(rnd.randint(1, 9)) + "，求其表面积与体积。",
+        "readQuestion": step(),
+        "analyses": [step() for _ in range(rnd.randint(1, 3))],
+        "standardAnswers": [step() for _ in range(rnd.randint(1, 3))],
+        "conclusion": step(),
+    }
+    preset = {str(k): {"content": f"第{k}问：底面积是多少？", "options": ["A. 4", "B. 6", "C. 8"]} for k in range(3)}
+    return {
+        "topic_id": f"{i:08d}-abcd-4e5f-9a0b-{rnd.getrandbits(48):012x}",
+        "tran_script": [{"tranScript": json.dumps({"scienceStruct": science_struct}, ensure_ascii=False), "version": 3}],
+        "preset_question": [{"presetQuestion": json.dumps({"scienceStruct": preset}, ensure_ascii=False)}],
+        "tran_script_operate_type": rnd.choice(["same", "null", "update"]),
+        "score": rnd.random(),
+    }
+
+
+def _timeit(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50000)
+    args = parser.parse_args()
+
+    records = [make_record(i) for i in range(args.n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        ref_path = os.path.join(tmp, "ref.json")
+        with open(ref_path, "w", encoding="utf-8") as writer:
+            for r in records:
+                writer.write(json.dumps(r, ensure_ascii=False) + "\n")
+        size_mb = os.path.getsize(ref_path) / 1024 / 1024
+        print(f"records={args.n} file={size_mb:.1f}MB")
+
+        print(f"{'codec':<10}{'save(s)':>10}{'read(s)':>10}  bytes_identical")
+        for name in available_codecs():
+            out_path = os.path.join(tmp, f"{name}.json")
+            t_save = _timeit(lambda: save_jsonl(iter(records), out_path, overwrite=True, codec=name))
+            t_read = _timeit(lambda: sum(1 for _ in read_jsonl(ref_path, codec=name)))
+            with open(ref_path, "rb") as a, open(out_path, "rb") as b:
+                identical = a.read() == b.read()
+            print(f"{get_codec(name).name:<10}{t_save:>10.2f}{t_read:>10.2f}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
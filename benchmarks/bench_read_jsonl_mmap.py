@@ -0,0 +1,78 @@
+"""
+对比 read_jsonl 文本模式与 binary(mmap) 模式的耗时与峰值 RSS。
+每种模式在独立子进程中运行，峰值 RSS 取自 resource.getrusage(RUSAGE_SELF).ru_maxrss。
+
+用法：
+    python benchmarks/bench_read_jsonl_mmap.py --size-mb 2048
+    python benchmarks/bench_read_jsonl_mmap.py --path /mnt/pan8T/.../junior_sm_1.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(common_utils_path)
+
+from bench_json_codec import make_record
+
+
+def make_file(path: str, size_mb: int) -> None:
+    target = size_mb * 1024 * 1024
+    # 预先生成一批记录循环写入，避免造数据本身成为瓶颈
+    lines = [json.dumps(make_record(i), ensure_ascii=False) + "\n" for i in range(2000)]
+    written = 0
+    with open(path, "w", encoding="utf-8") as writer:
+        while written < target:
+            for line in lines:
+                writer.write(line)
+                written += len(line.encode("utf-8"))
+
+
+def child(path: str, binary: bool, codec: str) -> None:
+    from common_utils import read_jsonl
+    t0 = time.perf_counter()
+    n = 0
+    for _ in read_jsonl(path, binary=binary, codec=codec):
+        n += 1
+    elapsed = time.perf_counter() - t0
+    # Linux 下 ru_maxrss 单位为 KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"records": n, "seconds": elapsed, "peak_rss_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", type=str, default=None, help="已有的 JSONL 文件，不指定则生成临时文件")
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--codec", type=str, default="auto")
+    parser.add_argument("--child", choices=["text", "binary"], default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.path, args.child == "binary", args.codec)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, "bench.json")
+            make_file(path, args.size_mb)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"file={size_mb:.0f}MB codec={args.codec}")
+        print(f"{'mode':<8}{'records':>10}{'seconds':>10}{'peak_rss(MB)':>14}")
+        for mode in ("text", "binary"):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, "--path", path, "--codec", args.codec],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            res = json.loads(out.strip().splitlines()[-1])
+            print(f"{mode:<8}{res['records']:>10}{res['seconds']:>10.2f}{res['peak_rss_mb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
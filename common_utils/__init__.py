@@ -4,22 +4,43 @@ from .io import (
     read_jsonl, 
     save_jsonl, 
     read_json, 
-    save_data_to_excel_merge
+    save_data_to_excel_merge,
+    build_jsonl_index,
+    read_jsonl_range,
+    lookup,
+    JsonlIndex,
+    JsonlWriter,
+    json_text_fragments,
+    convert_records
 )
 from .manipulation import (
     delete_fields, 
     rename_fields, 
     get_values_by_key_path,
+    extract_paths,
     has_key_path,
+    get_if_exists,
+    project_fields,
+    MutationPlan,
     # 如果你也想暴露单条处理函数，可以解开下面两行的注释
     # delete_field_by_path,
     # rename_field_by_path
 )
 from .filters import (
     remove_duplicates_interior, 
-    remove_duplicates_exterior
+    remove_duplicates_exterior,
+    build_dedup_index,
+    DedupIndex,
+    DigestSet,
+    remove_near_duplicates_interior,
+    remove_near_duplicates_exterior
 )
-from .decorators import checkpoint_to_file, run_pipeline
+from .paths import KeyPath, compile_accessor, PathSet, compile_paths
+from .decorators import checkpoint_to_file, run_pipeline, InputCursor
+from .codec import JsonCodec, get_codec, available_codecs
+from .near_dup import MinHashLSH, normalize_question_text
+from .profiling import instrument
+from .parallel import parallel_map, async_map
 
 __all__ = [
     # IO
@@ -27,18 +48,53 @@ __all__ = [
     "save_jsonl", 
     "read_json", 
     "save_data_to_excel_merge",
+    "build_jsonl_index",
+    "read_jsonl_range",
+    "lookup",
+    "JsonlIndex",
+    "JsonlWriter",
+    "json_text_fragments",
+    "convert_records",
     
     # Manipulation
     "delete_fields", 
     "rename_fields", 
     "get_values_by_key_path",
+    "extract_paths",
     "has_key_path",
+    "get_if_exists",
+    "project_fields",
+    "MutationPlan",
+
+    # Paths
+    "KeyPath",
+    "compile_accessor",
+    "PathSet",
+    "compile_paths",
     
     # Filters
     "remove_duplicates_interior",
     "remove_duplicates_exterior",
+    "build_dedup_index",
+    "DedupIndex",
+    "DigestSet",
+    "remove_near_duplicates_interior",
+    "remove_near_duplicates_exterior",
     
     # Decorators
     "checkpoint_to_file",
-    "run_pipeline"
+    "run_pipeline",
+    "InputCursor",
+    "instrument",
+    "parallel_map",
+    "async_map",
+
+    # Codec
+    "JsonCodec",
+    "get_codec",
+    "available_codecs",
+
+    # Near duplicates
+    "MinHashLSH",
+    "normalize_question_text",
 ]
\ No newline at end of file
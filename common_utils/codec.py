@@ -0,0 +1,180 @@
+"""
+JSON 编解码后端。
+
+read_jsonl / save_jsonl / checkpoint_to_file 通过这里的 codec 做逐行编解码：
+  - 解码：优先使用已安装的 orjson / msgspec，失败时回退到标准库 json，
+          保证报错类型与可接受的输入（NaN、超大整数等）和原来一致。
+  - 编码：输出必须与 json.dumps(obj, ensure_ascii=False) 逐字节一致
+          （orjson / msgspec 只能输出紧凑格式，分隔符不同），
+          因此统一使用预先构造好的标准库 JSONEncoder，省去每次调用 json.dumps 时重建 encoder 的开销。
+"""
+import itertools
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .manipulation import _project
+from .paths import compile_projection, K_DICT
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+# json.dumps(..., ensure_ascii=False) 每次调用都会新建 JSONEncoder，这里复用同一个实例
+_STDLIB_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+class JsonCodec:
+    """
+    标准库后端，同时也是其他后端的基类。
+    """
+    name = "json"
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        """
+        序列化为单行 JSON，与 json.dumps(obj, ensure_ascii=False) 输出一致。
+        """
+        return _STDLIB_ENCODER.encode(obj)
+
+    def projected_loads(self, fields: Tuple[str, ...]) -> Callable[[Union[str, bytes]], Any]:
+        """
+        返回只保留 fields 路径的解码函数，结果与 project_fields(loads(data), fields) 一致。
+        通用实现是完整解码后再投影（只省内存）；支持按类型部分解码的后端会覆盖此方法，连解码开销一起省掉。
+        """
+        tree = compile_projection(tuple(fields))
+        loads = self.loads
+        if tree is None:
+            return loads
+
+        def _loads(data):
+            obj = loads(data)
+            return _project(obj, tree) if isinstance(obj, dict) else obj
+        return _loads
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+# orjson 会把超出 64 位范围的整数解析成 float，含 19 位以上连续数字的行交给标准库。
+# 用 translate 把数字映射成 "0"、其余映射成空格后做子串查找，比正则快一个数量级。
+_DIGIT_TABLE = bytes(0x30 if 0x30 <= c <= 0x39 else 0x20 for c in range(256))
+_LONG_DIGITS = b"0" * 19
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        raw = data.encode("utf-8", "surrogatepass") if isinstance(data, str) else data
+        if _LONG_DIGITS in raw.translate(_DIGIT_TABLE):
+            return json.loads(data)
+        try:
+            return orjson.loads(data)
+        except Exception:
+            # orjson 不接受 NaN / 超过 64 位的整数等，交给标准库处理（或抛出标准库的错误）
+            return json.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except Exception:
+            return json.loads(data)
+
+    def projected_loads(self, fields: Tuple[str, ...]) -> Callable[[Union[str, bytes]], Any]:
+        """
+        按投影树动态生成 msgspec Struct 类型做部分解码：不需要的字段只做语法扫描，不会构建 Python 对象。
+        记录结构与投影树不符（比如期望 dict 的位置是字符串）时回退到完整解码再投影。
+        """
+        tree = compile_projection(tuple(fields))
+        if tree is None:
+            return self.loads
+        decoder = msgspec.json.Decoder(_projection_struct(tree))
+        to_builtins = msgspec.to_builtins
+        fallback = super().projected_loads(fields)
+
+        def _loads(data):
+            try:
+                return to_builtins(decoder.decode(data))
+            except Exception:
+                return fallback(data)
+        return _loads
+
+    def __reduce__(self):
+        # Decoder 不可 pickle，跨进程传递时按名字重建
+        return (get_codec, (self.name,))
+
+
+_STRUCT_COUNTER = itertools.count()
+
+
+def _projection_struct(children: dict) -> type:
+    """
+    投影树 -> msgspec Struct 类型。字段名用 f0、f1 ...，通过 rename 对应到原始键（键可能是中文或含特殊字符），
+    未出现的字段默认为 UNSET，to_builtins 时会被省略。
+    """
+    fields = []
+    for i, (key, node) in enumerate(children.items()):
+        if node.leaf:
+            tp = Any
+        elif node.kind == K_DICT:
+            tp = Union[_projection_struct(node.children), None, msgspec.UnsetType]
+        else:
+            tp = Union[List[Optional[_projection_struct(node.children)]], None, msgspec.UnsetType]
+        fields.append((f"f{i}", tp, msgspec.field(default=msgspec.UNSET, name=key)))
+    return msgspec.defstruct(f"Projection{next(_STRUCT_COUNTER)}", fields)
+
+
+_BACKENDS = {
+    "json": (JsonCodec, lambda: True),
+    "orjson": (OrjsonCodec, lambda: orjson is not None),
+    "msgspec": (MsgspecCodec, lambda: msgspec is not None),
+}
+# auto 模式下的优先级：msgspec 对超大整数的处理与标准库一致，不需要额外检查
+_AUTO_ORDER = ("msgspec", "orjson", "json")
+_CODEC_CACHE: Dict[str, JsonCodec] = {}
+
+
+def available_codecs() -> List[str]:
+    """
+    返回当前环境中可用的后端名称。
+    """
+    return [name for name, (_, available) in _BACKENDS.items() if available()]
+
+
+def get_codec(codec: Optional[Union[str, JsonCodec]] = None) -> JsonCodec:
+    """
+    获取 codec 实例。
+    :param codec: None / "auto" 按 msgspec > orjson > json 自动选择；
+                  也可以指定 "json" / "orjson" / "msgspec"，或直接传入 JsonCodec 实例
+    """
+    if isinstance(codec, JsonCodec):
+        return codec
+
+    name = "auto" if codec is None else str(codec).strip().lower()
+    if name == "auto":
+        name = next(n for n in _AUTO_ORDER if _BACKENDS[n][1]())
+
+    if name not in _BACKENDS:
+        raise ValueError(f"未知的 codec: {codec!r}，可选: {list(_BACKENDS)}")
+    cls, available = _BACKENDS[name]
+    if not available():
+        raise ImportError(f"codec {name!r} 依赖的库未安装")
+
+    if name not in _CODEC_CACHE:
+        _CODEC_CACHE[name] = cls()
+    return _CODEC_CACHE[name]
@@ -1,12 +1,338 @@
 from functools import wraps
-from typing import Callable, Iterable, Any, Optional, Generator
+from typing import Callable, Iterable, Any, Optional, Generator, Union
 from pathlib import Path
-from .io import read_jsonl, save_jsonl
+from .io import read_jsonl, save_jsonl, JsonlWriter, glob_data_files, _compression_of, _file_signature
+from .codec import JsonCodec, get_codec
+from .frames import FRAMES_HEADER, FrameEncoder, is_frames_path
+from .profiling import instrument, profile_pipeline
+import hashlib
+import inspect
+import itertools
+import json
 import logging
+import os
+import re
 from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# ==================== 内容寻址缓存 (mode="cache") ====================
+
+_CACHE_MANIFEST_VERSION = 1
+_GLOB_MAGIC = re.compile(r"[*?\[]")
+# hash_inputs=True 时按块计算输入文件内容摘要
+_HASH_CHUNK = 1024 * 1024
+
+class _Unfingerprintable(Exception):
+    """
+    参数无法稳定地指纹化（生成器、默认 repr 带内存地址的对象等）。
+    """
+
+def _manifest_path(path: Path) -> Path:
+    """
+    缓存清单放在 checkpoint 文件旁边，以 "." 开头，避免被 "dir/*" 这类 glob 模式误读：
+      dir/part1.json -> dir/.part1.json.ckpt.json
+    """
+    return path.with_name(f".{path.name}.ckpt.json")
+
+def _digest(data: Union[str, bytes]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _func_source(func: Callable) -> str:
+    """
+    被装饰函数的源码；取不到源码（交互式定义、只有 .pyc 等）时退化为字节码。
+    """
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        code = getattr(func, "__code__", None)
+        body = code.co_code.hex() + repr(code.co_consts) if code is not None else ""
+        return f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}:{body}"
+
+def _canonical_arg(value: Any) -> Any:
+    """
+    参数 -> 可 JSON 序列化的规范形式，用于计算参数指纹。
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, os.PathLike):
+        return Path(value).as_posix()
+    if isinstance(value, (list, tuple)):
+        return [_canonical_arg(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical_arg(v) for v in value), key=repr)
+    if isinstance(value, dict):
+        return {str(k): _canonical_arg(v) for k, v in sorted(value.items(), key=lambda kv: repr(kv[0]))}
+    if callable(value) and hasattr(value, "__code__"):
+        return f"<func {_digest(_func_source(value))}>"
+    if inspect.isgenerator(value) or hasattr(value, "__next__"):
+        raise _Unfingerprintable(f"迭代器 ({type(value).__name__})")
+    if type(value).__repr__ is object.__repr__:
+        raise _Unfingerprintable(f"默认 repr 的对象 ({type(value).__name__})")
+    return repr(value)
+
+def _iter_referenced_files(value: Any) -> Iterable[str]:
+    """
+    找出参数中引用的输入文件：已存在的文件路径，或能匹配到文件的 glob 模式（含 .gz / .zst 版本）。
+    """
+    if isinstance(value, (str, os.PathLike)):
+        text = Path(value).as_posix() if isinstance(value, os.PathLike) else value
+        # 普通字符串参数（提示词正文、键路径等）不当作路径
+        if not text or "\n" in text or len(text) > 4096:
+            return
+        if os.path.isfile(text):
+            yield text
+        elif _GLOB_MAGIC.search(text):
+            yield from glob_data_files(text)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for v in value:
+            yield from _iter_referenced_files(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _iter_referenced_files(v)
+
+def _content_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as reader:
+        for chunk in iter(lambda: reader.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _bound_arguments(func: Callable, args: tuple, kwargs: dict) -> dict:
+    """
+    参数名 -> 值（含默认值），不含 checkpoint_to_file 注入的 cursor。
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    except (TypeError, ValueError):
+        # 参数与签名不匹配，交给函数本身报错
+        arguments = {"args": list(args), "kwargs": kwargs}
+    arguments.pop(_CURSOR_PARAM, None)
+    return arguments
+
+def _stage_fingerprint(func: Callable, args: tuple, kwargs: dict, output: Path,
+                       hash_inputs: bool) -> Optional[dict]:
+    """
+    计算一次调用的指纹，返回各组成部分：
+      - args:   绑定默认值后的参数摘要
+      - source: 被装饰函数的源码摘要
+      - inputs: 参数引用的输入文件 -> 大小 + mtime（hash_inputs=True 时为大小 + 内容摘要）
+    参数无法指纹化时返回 None，本次调用总是重新执行。
+    """
+    arguments = _bound_arguments(func, args, kwargs)
+    try:
+        canonical = _canonical_arg(arguments)
+    except _Unfingerprintable as e:
+        logger.warning(f"[Checkpoint] 参数无法指纹化: {e}，本次总是重新执行: {output}")
+        return None
+
+    output_real = os.path.realpath(output)
+    inputs = {}
+    for file_path in _iter_referenced_files(list(arguments.values())):
+        if file_path in inputs or os.path.realpath(file_path) == output_real:
+            continue
+        sig = _file_signature(file_path)
+        if hash_inputs:
+            inputs[file_path] = {"size": sig["size"], "blake2b": _content_digest(file_path)}
+        else:
+            inputs[file_path] = sig
+
+    return {
+        "args": _digest(json.dumps(canonical, ensure_ascii=False, sort_keys=True)),
+        "source": _digest(_func_source(func)),
+        "inputs": inputs,
+    }
+
+def _load_manifest(manifest: Path, version: int = _CACHE_MANIFEST_VERSION) -> Optional[dict]:
+    if not manifest.exists():
+        return None
+    try:
+        with open(manifest, "r", encoding="utf-8") as reader:
+            meta = json.load(reader)
+    except Exception as e:
+        logger.warning(f"[Checkpoint] 缓存清单损坏，视为缓存失效 [{manifest}]: {e}")
+        return None
+    if meta.get("version") != version:
+        return None
+    return meta
+
+def _save_manifest(manifest: Path, meta: dict) -> None:
+    tmp = manifest.with_name(manifest.name + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as writer:
+            json.dump(meta, writer, ensure_ascii=False, indent=2)
+        os.replace(tmp, manifest)
+    except OSError as e:
+        # 清单写不进去只影响下次的缓存判定（会重新执行），不影响本次结果
+        logger.warning(f"[Checkpoint] 缓存清单写入失败 [{manifest}]: {e}")
+
+def _cache_miss_reason(fingerprint: Optional[dict], meta: Optional[dict], path: Path) -> Optional[str]:
+    """
+    返回需要重新执行的原因；缓存有效时返回 None。
+    """
+    if not path.exists():
+        return "文件不存在"
+    if fingerprint is None:
+        return "参数无法指纹化"
+    if meta is None:
+        return "缺少缓存清单"
+    if meta.get("source") != fingerprint["source"]:
+        return "函数源码已变化"
+    if meta.get("args") != fingerprint["args"]:
+        return "参数已变化"
+    old_inputs, new_inputs = meta.get("inputs", {}), fingerprint["inputs"]
+    if old_inputs != new_inputs:
+        changed = sorted(p for p in set(old_inputs) | set(new_inputs) if old_inputs.get(p) != new_inputs.get(p))
+        shown = ", ".join(changed[:3]) + (f" 等 {len(changed)} 个" if len(changed) > 3 else "")
+        return f"输入文件已变化: {shown}"
+    if meta.get("output") != _file_signature(path.as_posix()):
+        return "checkpoint 文件已被修改"
+    return None
+
+# ==================== 可续跑 checkpoint (mode="resume") ====================
+
+_RESUME_VERSION = 1
+# 被装饰函数声明了这个参数时，checkpoint_to_file 会注入 InputCursor
+_CURSOR_PARAM = "cursor"
+
+class InputCursor:
+    """
+    可续跑 stage 的输入位置：已从输入源取出的记录数。
+    被装饰函数声明 cursor 参数，并用 cursor.track() 包住自己的输入源即可：
+
+        @checkpoint_to_file
+        def pipeline_xxx(orig_data_path, cursor=None):
+            samples = cursor.track(read_jsonl(orig_data_path))
+            yield from process(samples)
+
+    续跑时 track() 先跳过已处理的 start 条输入。输入源自己能定位时（如 read_jsonl_range(path, start=cursor.start)），
+    传 skipped=True 避免重复读取。
+    要求 track() 与 yield 之间的各层生成器逐条处理、不预读输入，否则续跑时预读的记录会丢失。
+    """
+
+    def __init__(self, start: int = 0, on_advance: Optional[Callable[[int], None]] = None):
+        """
+        :param on_advance: 每次取下一条输入前回调，参数为已取出的条数。
+                           此时之前的输入都已处理完，它们的输出也都已交给下游
+        """
+        self.start = start
+        self.position = start
+        self.on_advance = on_advance
+
+    def track(self, samples: Iterable[Any], skipped: bool = False) -> Generator[Any, None, None]:
+        it = iter(samples)
+        if self.start and not skipped:
+            skipped_count = sum(1 for _ in itertools.islice(it, self.start))
+            if skipped_count < self.start:
+                logger.warning(f"[Checkpoint] 输入只有 {skipped_count} 条，少于上次记录的位置 {self.start}，输入可能已变化")
+        self.position = self.start
+        on_advance = self.on_advance
+        for sample in it:
+            if on_advance is not None:
+                on_advance(self.position)
+            self.position += 1
+            yield sample
+
+    def __repr__(self) -> str:
+        return f"<InputCursor start={self.start} position={self.position}>"
+
+def _resume_state_path(path: Path) -> Path:
+    """
+    dir/part1.json -> dir/.part1.json.resume.json
+    """
+    return path.with_name(f".{path.name}.resume.json")
+
+def _args_digest(func: Callable, args: tuple, kwargs: dict) -> Optional[str]:
+    try:
+        canonical = _canonical_arg(_bound_arguments(func, args, kwargs))
+    except _Unfingerprintable:
+        return None
+    return _digest(json.dumps(canonical, ensure_ascii=False, sort_keys=True))
+
+def _run_resumable(func: Callable, args: tuple, kwargs: dict, path: Path, codec: JsonCodec,
+                   overwrite: bool, commit_every: int, replay: bool) -> Generator[Any, None, None]:
+    """
+    执行 stage 并直接追加写入 path，每条记录写入后交出。每处理 commit_every 条输入提交一次进度：
+      {"input_pos": 已处理完的输入条数, "output_bytes": 对应的输出字节数, "records": 输出条数}
+    提交发生在 cursor 取下一条输入之前，此时已处理的输入与已写出的输出一一对应。
+    重启时把输出截断到提交的字节数，让 cursor 跳过已处理的输入，再追加写入。
+    :param replay: 续跑时先从文件交出上次已提交的输出（tee 模式下游需要完整的数据流）
+    """
+    state_path = _resume_state_path(path)
+    digest = _args_digest(func, args, kwargs)
+    state = None if overwrite else _load_manifest(state_path, _RESUME_VERSION)
+
+    start, committed_bytes, records = 0, 0, 0
+    if state is not None and not state.get("complete"):
+        size = path.stat().st_size if path.exists() else -1
+        if digest is None or state.get("args") != digest:
+            logger.info(f"[Checkpoint] 参数与上次不同，从头执行: {path}")
+        elif size < state["output_bytes"]:
+            logger.warning(f"[Checkpoint] 输出文件比提交的进度短（{size} < {state['output_bytes']}），从头执行: {path}")
+        else:
+            start, committed_bytes, records = state["input_pos"], state["output_bytes"], state["records"]
+            logger.info(f"[Checkpoint] 续跑: 跳过 {start} 条已处理输入，保留 {records} 条输出，"
+                        f"丢弃未提交的 {size - committed_bytes} 字节: {path}")
+    else:
+        logger.info(f"[Checkpoint] 开始执行 ({'overwrite=True' if overwrite else '文件不存在'})。结果将写入: {path}")
+
+    def commit(input_pos: int, complete: bool = False) -> None:
+        _save_manifest(state_path, {"version": _RESUME_VERSION, "args": digest, "input_pos": input_pos,
+                                    "output_bytes": written, "records": records, "complete": complete})
+
+    written = committed_bytes
+    last_commit = start
+    # 先落盘初始状态，保证半截的输出文件旁边总有进度文件
+    commit(start)
+    if committed_bytes:
+        os.truncate(path, committed_bytes)
+        if replay:
+            yield from read_jsonl(path.as_posix(), codec=codec)
+    frames = is_frames_path(path)
+    with open(path, "ab" if committed_bytes else "wb") as writer:
+        if frames and not committed_bytes:
+            writer.write(FRAMES_HEADER)
+            written = len(FRAMES_HEADER)
+
+        def on_advance(input_pos: int) -> None:
+            nonlocal last_commit
+            if input_pos - last_commit >= commit_every:
+                writer.flush()
+                commit(input_pos)
+                last_commit = input_pos
+
+        cursor = InputCursor(start, on_advance)
+        dumps = codec.dumps
+        frame_encode = FrameEncoder(codec).encode if frames else None
+        for sample in func(*args, **{**kwargs, _CURSOR_PARAM: cursor}):
+            line = (dumps(sample) + "\n").encode("utf-8") if frame_encode is None else frame_encode(sample)
+            writer.write(line)
+            written += len(line)
+            records += 1
+            yield sample
+    commit(cursor.position, complete=True)
+    logger.info(f"已保存: {path} (共 {records} 条)")
+
+def _tee_to_file(samples: Iterable[Any], path: Path, codec: JsonCodec,
+                 compress_level: Optional[int], compress_threads: Optional[int]) -> Generator[Any, None, None]:
+    """
+    每条记录先编码写入 checkpoint，再把同一个对象交给下游。
+    写入走 JsonlWriter（临时文件 + 原子替换）：下游提前停止消费或中途异常时放弃临时文件，不会留下半截的 checkpoint。
+    """
+    count = 0
+    with JsonlWriter(path.as_posix(), codec=codec, compress_level=compress_level,
+                     compress_threads=compress_threads) as writer:
+        write = writer.write
+        for sample in samples:
+            write(sample)
+            count += 1
+            yield sample
+    logger.info(f"已保存: {path} (共 {count} 条)")
+
 def checkpoint_to_file(func: Callable[..., Iterable[Any]]):
     """
     装饰器：将生成器函数的结果保存到文件，实现断点续传或缓存。
@@ -16,35 +342,80 @@ def checkpoint_to_file(func: Callable[..., Iterable[Any]]):
       mode (str): 
         - "read":  强制只读。文件不存在则报错。
         - "write": 强制执行函数并写入文件。完成后返回文件内容的生成器。
+        - "cache": 内容寻址缓存。对参数、被装饰函数的源码、参数引用的输入文件（大小 + mtime）计算指纹，
+                   存入 checkpoint 旁的清单文件（.xxx.json.ckpt.json）；指纹一致时直接读取文件，
+                   任一部分变化（如提示词文件被修改）时自动重新执行并覆盖。
+                   注意：只覆盖被装饰函数自身的源码，它调用的其他函数被修改时需要 overwrite=True。
+        - "resume": 可续跑的 write。边执行边追加写入 save_path，每处理 commit_every 条输入向 .xxx.json.resume.json 提交一次
+                   (已处理输入条数, 输出字节数)；进程中断后再次运行时截断到上次提交处，跳过已处理的输入继续追加。
+                   被装饰函数需声明 cursor 参数并用 cursor.track() 包住输入源，见 InputCursor。
+                   不支持 .gz / .zst 输出。上次已完整执行（或文件由 write 模式生成）时直接读取。
         - None:    不涉及文件操作，直接执行函数并消耗完生成器（通常用于调试或纯执行）。
+      tee (bool): 
+        - 仅在 mode="write" / "cache" / "resume" 时有效。
+        - True:  需要执行时边写 checkpoint 边把同一条记录交给下游，下游不必等整个 stage 写完再重新读取解析。
+                 下游拿到的是函数产出的原始对象（未经 JSON 往返，如 tuple 不会变成 list），
+                 写入文件的是交出前那一刻的内容。缓存命中时仍从文件读取。
+        - False: "Write-then-Read"，见下方说明。
       overwrite (bool): 
-        - 仅在 mode="write" 时有效。
+        - 仅在 mode="write" / "cache" / "resume" 时有效。
         - True:  强制重新执行函数并覆盖文件。
-        - False: 如果文件已存在，则跳过执行，直接读取文件；如果文件不存在，则执行并写入。
+        - False: write 模式下如果文件已存在，则跳过执行，直接读取文件；如果文件不存在，则执行并写入。
+      hash_inputs (bool): 
+        - 仅在 mode="cache" 时有效。True 时输入文件按内容摘要比较（只改 mtime 不会触发重跑，但每次都要读一遍输入）。
+      commit_every (int): 
+        - 仅在 mode="resume" 时有效。两次提交进度之间处理的输入条数。
+      codec (str | JsonCodec): 
+        - 读写 checkpoint 文件使用的 JSON 后端，None 为自动选择，见 common_utils.codec。
+      compress_level / compress_threads (int): 
+        - save_path 以 .gz / .zst 结尾时自动压缩写入、解压读取，这两个参数控制压缩级别与 zstd 线程数。
+      save_path 以 .frames（.frames.gz / .frames.zst）结尾时 checkpoint 按二进制帧格式读写，省去 JSON 文本的编解码，
+      适合只在 stage 之间传递、不需要人工查看的中间文件，见 common_utils.frames。
     
     修复说明:
       原版使用了 deque 缓存所有数据，会导致大数据量下内存溢出 (OOM)。
       新版采用 "Write-then-Read" 策略：先将数据流写入磁盘，完成后重新打开文件进行流式读取。
       虽然增加了磁盘 I/O，但保证了内存占用的恒定和安全。
+      tee=True 时逐条写入、逐条交出，同样不积压数据，还省掉一次完整的重新读取和 JSON 解析，上下游 stage 可以重叠执行。
     """
+    accepts_cursor = _CURSOR_PARAM in inspect.signature(func).parameters
+
+    def call(args: tuple, kwargs: dict):
+        # 非续跑模式下注入从 0 开始的 cursor，同一个函数在所有模式下都能用
+        if accepts_cursor and _CURSOR_PARAM not in kwargs:
+            kwargs = {**kwargs, _CURSOR_PARAM: InputCursor()}
+        return func(*args, **kwargs)
 
     @wraps(func)
-    def decorator_args(save_path: str, mode: Optional[str] = None, overwrite: bool = False):
+    def decorator_args(save_path: str, mode: Optional[str] = None, overwrite: bool = False,
+                       codec: Optional[Union[str, JsonCodec]] = None,
+                       compress_level: Optional[int] = None, compress_threads: Optional[int] = None,
+                       hash_inputs: bool = False, commit_every: int = 1000, tee: bool = False):
         mode_norm = None if mode is None else str(mode).strip().lower()
-        if mode_norm not in (None, "write", "read"):
-            raise ValueError(f'checkpoint mode 必须是 "write" / "read" / None，当前是: {mode!r}')
+        if mode_norm not in (None, "write", "read", "cache", "resume"):
+            raise ValueError(f'checkpoint mode 必须是 "write" / "read" / "cache" / "resume" / None，当前是: {mode!r}')
 
         path = Path(save_path)
+        codec_obj = get_codec(codec)
+        if mode_norm == "resume":
+            if not accepts_cursor:
+                raise TypeError(f'mode="resume" 需要 {func.__qualname__} 声明 {_CURSOR_PARAM} 参数并用 cursor.track() 包住输入源')
+            if _compression_of(path) is not None:
+                raise ValueError(f'mode="resume" 不支持压缩输出: {path}')
 
         @wraps(func)
         def wrapper(*args, **kwargs):
+            # 整个 stage 作为一层，run_pipeline(profile=True) 时统计
+            return instrument(run_stage(args, kwargs), func.__qualname__)
+
+        def run_stage(args: tuple, kwargs: dict):
             # ==================== READ 模式 ====================
             if mode_norm == "read":
                 if not path.exists():
                     logger.error(f"[Checkpoint] 读取模式失败，文件不存在: {path}")
                     raise FileNotFoundError(f"文件不存在: {path}")
                 logger.info(f"[Checkpoint] 模式=READ，直接读取: {path}")
-                yield from read_jsonl(path.as_posix())
+                yield from read_jsonl(path.as_posix(), codec=codec_obj)
                 return
 
             # ==================== WRITE 模式 ====================
@@ -64,15 +435,22 @@ def checkpoint_to_file(func: Callable[..., Iterable[Any]]):
                     logger.info(f"[Checkpoint] 缓存命中 (overwrite=False)。跳过执行，直接读取: {path}")
                     pass
 
+                if should_run_and_write and tee:
+                    reason = "overwrite=True" if overwrite else "文件不存在"
+                    logger.info(f"[Checkpoint] 开始执行 ({reason}，tee)。结果边写入边传给下游: {path}")
+                    yield from _tee_to_file(call(args, kwargs), path, codec_obj, compress_level, compress_threads)
+                    return
+
                 if should_run_and_write:
                     # [建议补充] 明确告知用户开始执行
                     reason = "overwrite=True" if overwrite else "文件不存在"
                     logger.info(f"[Checkpoint] 开始执行 ({reason})。结果将写入: {path}")
                     # 1. 获取原始生成器
-                    src_gen = func(*args, **kwargs)
+                    src_gen = call(args, kwargs)
                     # 2. 消费生成器并写入文件 (save_jsonl 内部会迭代 src_gen)
                     #    此时数据流过内存直接入盘，不会积压
-                    save_jsonl(src_gen, path.as_posix(), overwrite=True)
+                    save_jsonl(src_gen, path.as_posix(), overwrite=True, codec=codec_obj,
+                               compress_level=compress_level, compress_threads=compress_threads)
 
                 # 3. 无论刚才是否写入，现在都从文件流式读取返回给下游
                 #    保证下游拿到的永远是来自磁盘的数据流，内存安全
@@ -81,13 +459,59 @@ def checkpoint_to_file(func: Callable[..., Iterable[Any]]):
                     # 或者 func 报错中断了。这里做个防御。
                     return 
                     
-                yield from read_jsonl(path.as_posix())
+                yield from read_jsonl(path.as_posix(), codec=codec_obj)
+                return
+
+            # ==================== CACHE 模式 ====================
+            if mode_norm == "cache":
+                path.parent.mkdir(parents=True, exist_ok=True)
+                manifest = _manifest_path(path)
+                fingerprint = _stage_fingerprint(func, args, kwargs, path, hash_inputs)
+                reason = "overwrite=True" if overwrite else _cache_miss_reason(fingerprint, _load_manifest(manifest), path)
+
+                if reason is None:
+                    logger.info(f"[Checkpoint] 缓存命中 (指纹一致)。跳过执行，直接读取: {path}")
+                    yield from read_jsonl(path.as_posix(), codec=codec_obj)
+                    return
+
+                logger.info(f"[Checkpoint] 开始执行 ({reason}{'，tee' if tee else ''})。结果将写入: {path}")
+                # 先删除旧清单：写入中断时不会留下"新文件 + 旧指纹"的组合
+                if manifest.exists():
+                    manifest.unlink()
+                if tee:
+                    yield from _tee_to_file(call(args, kwargs), path, codec_obj, compress_level, compress_threads)
+                else:
+                    save_jsonl(call(args, kwargs), path.as_posix(), overwrite=True, codec=codec_obj,
+                               compress_level=compress_level, compress_threads=compress_threads)
+                if fingerprint is not None:
+                    _save_manifest(manifest, {"version": _CACHE_MANIFEST_VERSION,
+                                              "func": f"{func.__module__}.{func.__qualname__}",
+                                              **fingerprint,
+                                              "output": _file_signature(path.as_posix())})
+                if not tee:
+                    yield from read_jsonl(path.as_posix(), codec=codec_obj)
+                return
+
+            # ==================== RESUME 模式 ====================
+            if mode_norm == "resume":
+                path.parent.mkdir(parents=True, exist_ok=True)
+                state = None if overwrite else _load_manifest(_resume_state_path(path), _RESUME_VERSION)
+                if path.exists() and not overwrite and (state is None or state.get("complete")):
+                    # 没有进度文件的已有输出来自 write 模式（原子写入，必然完整）
+                    logger.info(f"[Checkpoint] 缓存命中 (已完整执行)。跳过执行，直接读取: {path}")
+                elif tee:
+                    yield from _run_resumable(func, args, kwargs, path, codec_obj, overwrite, commit_every, replay=True)
+                    return
+                else:
+                    deque(_run_resumable(func, args, kwargs, path, codec_obj, overwrite, commit_every, replay=False),
+                          maxlen=0)
+                yield from read_jsonl(path.as_posix(), codec=codec_obj)
                 return
 
             # ==================== NONE 模式 ====================
             # 仅消耗生成器，不返回数据，不存文件
             # 这种模式通常用于只需要副作用（side-effects）的场景
-            for _ in func(*args, **kwargs):
+            for _ in call(args, kwargs):
                 pass
             return None
 
@@ -95,9 +519,17 @@ def checkpoint_to_file(func: Callable[..., Iterable[Any]]):
 
     return decorator_args
 
-def run_pipeline(pipeline_generator):
+def run_pipeline(pipeline_generator, profile: bool = False, report_path: Optional[str] = None,
+                 trace_memory: bool = True) -> Optional[dict]:
     """
     消费生成器，驱动管道执行。
     使用 maxlen=0 的 deque 是消费迭代器最快且不占内存的方法。
+    :param profile: True 时统计用 instrument() 包装的各层（checkpoint_to_file 的 stage 自动包装）的
+                    输入 / 输出条数、wall / self 耗时与 tracemalloc 峰值内存，结束时打印报告并返回，见 common_utils.profiling
+    :param report_path: profile=True 时把报告另存为 JSON
+    :param trace_memory: profile=True 时是否统计内存
     """
-    deque(pipeline_generator, maxlen=0)
\ No newline at end of file
+    if profile:
+        return profile_pipeline(pipeline_generator, report_path=report_path, trace_memory=trace_memory)
+    deque(pipeline_generator, maxlen=0)
+    return None
@@ -1,17 +1,26 @@
-import glob
+import hashlib
+import heapq
 import json
-from typing import List, Union, Any
+import os
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_left
+from typing import List, Optional, Tuple, Union, Any
 import logging
 from .manipulation import get_values_by_key_path
+from .paths import PathSet, compile_paths
+from .io import (glob_data_files, open_text, _index_sidecar_path, _file_signature,
+                 _load_sidecar, _save_sidecar, _INDEX_VERSION)
+from .codec import get_codec
+from .near_dup import MinHashLSH, normalize_question_text
 logger = logging.getLogger(__name__)
 
-def _extract_key_value(item: Any, path: str) -> Union[str, None]:
+def _vals_to_key(vals: List[Any]) -> Union[str, None]:
     """
-    辅助函数：从 item 中提取 path 对应的值，并转为 string 以便去重。
+    把一条路径命中的值转为 string 以便去重。
     如果 path 匹配到多个值（如列表），则将其转换为 tuple 字符串。
     """
-    vals = get_values_by_key_path(item, path)
-    
     if not vals:
         return None
     
@@ -24,36 +33,397 @@ def _extract_key_value(item: Any, path: str) -> Union[str, None]:
         
     return str(v) if v is not None else None
 
-def remove_duplicates_interior(samples, key_paths: Union[str, List[str]]):
+def _extract_key_value(item: Any, path: str) -> Union[str, None]:
+    """
+    辅助函数：从 item 中提取 path 对应的值，并转为 string 以便去重。
+    """
+    return _vals_to_key(get_values_by_key_path(item, path))
+
+def _extract_key(item: Any, path_set: PathSet) -> tuple:
+    """
+    一次遍历取出全部去重字段，返回去重键。
+    """
+    return tuple(_vals_to_key(vals) for vals in path_set.get_all(item))
+
+# ==================== 哈希去重键 ====================
+
+def _key_bytes(key: tuple) -> bytes:
+    # 键是 str / None 组成的 tuple，repr 即为无歧义的规范编码，比 json.dumps 快得多
+    return repr(key).encode("utf-8", "surrogatepass")
+
+def _key_digest(key: tuple) -> bytes:
+    """
+    去重键 -> 128 位 blake2b 摘要。
+    n 个不同键中出现任意一次碰撞的概率约为 n^2 / 2^129（1000 万个键时约 1.5e-25），可以忽略。
+    """
+    return hashlib.blake2b(_key_bytes(key), digest_size=16).digest()
+
+_DIGEST_SIZE = 16
+_EMPTY_SLOT = bytes(_DIGEST_SIZE)
+
+class DigestSet:
+    """
+    固定 16 字节摘要的集合：开放寻址（线性探测）哈希表，全部槽位放在同一个 bytearray 中，
+    每个键只占 16 字节 / 装载率，没有 Python 对象开销（set 中每个 bytes 键约 80~100 字节）。
+    摘要本身是均匀分布的，直接取前 8 字节作为槽位哈希；全 0 摘要用来表示空槽，出现概率为 2^-128。
+    """
+    __slots__ = ("_table", "_mask", "_size")
+
+    _MAX_LOAD = 0.6
+
+    def __init__(self, capacity: int = 1 << 16):
+        slots = 1
+        while slots < capacity / self._MAX_LOAD:
+            slots <<= 1
+        self._table = bytearray(slots * _DIGEST_SIZE)
+        self._mask = slots - 1
+        self._size = 0
+
+    def _find(self, digest: bytes) -> Tuple[int, bool]:
+        table, mask = self._table, self._mask
+        i = int.from_bytes(digest[:8], "little") & mask
+        while True:
+            off = i * _DIGEST_SIZE
+            slot = table[off:off + _DIGEST_SIZE]
+            if slot == digest:
+                return off, True
+            if slot == _EMPTY_SLOT:
+                return off, False
+            i = (i + 1) & mask
+
+    def add(self, digest: bytes) -> bool:
+        """
+        加入摘要，返回是否为新键。
+        """
+        if digest == _EMPTY_SLOT:
+            digest = _EMPTY_SLOT[:-1] + b"\x01"
+        off, found = self._find(digest)
+        if found:
+            return False
+        self._table[off:off + _DIGEST_SIZE] = digest
+        self._size += 1
+        if self._size > (self._mask + 1) * self._MAX_LOAD:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old = self._table
+        self._table = bytearray(len(old) * 2)
+        self._mask = len(self._table) // _DIGEST_SIZE - 1
+        for off in range(0, len(old), _DIGEST_SIZE):
+            digest = old[off:off + _DIGEST_SIZE]
+            if digest != _EMPTY_SLOT:
+                new_off, _ = self._find(bytes(digest))
+                self._table[new_off:new_off + _DIGEST_SIZE] = digest
+
+    def __contains__(self, digest: bytes) -> bool:
+        if digest == _EMPTY_SLOT:
+            digest = _EMPTY_SLOT[:-1] + b"\x01"
+        return self._find(digest)[1]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        table = self._table
+        for off in range(0, len(table), _DIGEST_SIZE):
+            digest = table[off:off + _DIGEST_SIZE]
+            if digest != _EMPTY_SLOT:
+                yield bytes(digest)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._table)
+
+def _make_seen(hash_keys: bool):
+    """
+    返回 (seen 容器, 键转换函数)。hash_keys=True 时键转为 128 位摘要存入 DigestSet。
+    """
+    if hash_keys:
+        return DigestSet(), _key_digest
+    return set(), None
+
+def remove_duplicates_interior(samples, key_paths: Union[str, List[str]], hash_keys: bool = False,
+                               memory_limit_mb: Optional[float] = None, spill_dir: Optional[str] = None,
+                               keep_order: bool = True):
     """
     内部根据字段去重
+    :param hash_keys: 为 True 时 seen 中只保存去重键的 128 位摘要（DigestSet，每个键约 16~40 字节），
+                      键是长文本（题干、解析）时可以大幅降低内存；碰撞概率见 _key_digest
+    :param memory_limit_mb: 设置后使用超内存去重（隐含 hash_keys=True）：seen 超出预算时按摘要哈希分桶落盘，
+                            每个桶单独去重，见 _dedup_spill。落盘后产出的是记录的反序列化副本
+    :param spill_dir: 落盘的临时目录所在位置，默认为系统临时目录
+    :param keep_order: 超内存去重时保持原始顺序（保留第一次出现的记录）；为 False 时按桶输出，省去最后的归并
     """
     if isinstance(key_paths, str):
         key_paths = [key_paths]
-    seen = set()
+    path_set = compile_paths(tuple(key_paths))
+    if memory_limit_mb is not None:
+        yield from _dedup_spill(samples, path_set, memory_limit_mb, spill_dir, keep_order)
+        return
+    seen, to_key = _make_seen(hash_keys)
+    if to_key is not None:
+        for sample in samples:
+            if seen.add(to_key(_extract_key(sample, path_set))):
+                yield sample
+        return
     for sample in samples:
-        key_list = []
-        for path in key_paths:
-            v_str = _extract_key_value(sample, path)
-            key_list.append(v_str)
-        
-        key_tuple = tuple(key_list)
+        key_tuple = _extract_key(sample, path_set)
         if key_tuple not in seen:
             seen.add(key_tuple)
             yield sample
 
-def remove_duplicates_exterior(samples, target_file_patterns, key_paths):
+# ==================== 超内存去重 (哈希分桶 + 落盘) ====================
+
+_SPILL_FANOUT = 64
+# DigestSet 扩容瞬间新旧两张表同时存在，按每个键 64 字节估算
+_SPILL_BYTES_PER_KEY = 64
+# 摘要只有 16 字节，同一个桶最多再细分 8 层（DigestSet 用前 8 字节定位槽位，分桶从末尾取字节，互不干扰）
+_SPILL_MAX_DEPTH = 8
+_SPILL_MERGE_FANIN = 256
+
+def _spill_bucket_of(digest: bytes, depth: int) -> int:
+    return digest[-1 - depth] % _SPILL_FANOUT
+
+class _SpillBuckets:
+    """
+    一组落盘桶文件。每行为 "-\t摘要" （已输出过的键，只占位）或 "序号\t摘要\t记录 JSON"。
+    同一个桶内标记行总在记录行之前，记录行按序号递增。
+    """
+
+    def __init__(self, tmp_dir: str, name: str, depth: int):
+        self.depth = depth
+        self.paths = [os.path.join(tmp_dir, f"{name}_{i:02d}") for i in range(_SPILL_FANOUT)]
+        self.counts = [0] * _SPILL_FANOUT
+        self._writers = [open(p, "w", encoding="utf-8") for p in self.paths]
+
+    def write(self, digest: bytes, line: str) -> None:
+        b = _spill_bucket_of(digest, self.depth)
+        self._writers[b].write(line)
+        self.counts[b] += 1
+
+    def close(self) -> None:
+        for writer in self._writers:
+            writer.close()
+
+def _iter_spill_leaves(path: str, count: int, depth: int, max_keys: int, tmp_dir: str):
+    """
+    产出能在内存预算内单独去重的桶文件；超出预算的桶按摘要的下一个字节继续细分。
+    """
+    if count <= max_keys or depth >= _SPILL_MAX_DEPTH:
+        yield path
+        return
+    sub = _SpillBuckets(tmp_dir, os.path.basename(path), depth)
+    with open(path, encoding="utf-8") as reader:
+        for line in reader:
+            sub.write(bytes.fromhex(line.split("\t", 2)[1]), line)
+    sub.close()
+    os.remove(path)
+    for sub_path, sub_count in zip(sub.paths, sub.counts):
+        yield from _iter_spill_leaves(sub_path, sub_count, depth + 1, max_keys, tmp_dir)
+
+def _iter_spill_first(path: str):
+    """
+    对单个桶去重，按序号顺序产出第一次出现的 (序号, 记录 JSON)。
+    """
+    seen = DigestSet()
+    with open(path, encoding="utf-8") as reader:
+        for line in reader:
+            seq, digest_hex, *rest = line.rstrip("\n").split("\t", 2)
+            if seen.add(bytes.fromhex(digest_hex)) and rest:
+                yield int(seq), rest[0]
+    os.remove(path)
+
+def _merge_kept_files(paths: List[str]):
+    """
+    按序号多路归并若干个 "序号\t记录 JSON" 文件，产出原始行，读完后删除文件。
+    """
+    readers = [open(p, encoding="utf-8") for p in paths]
+    try:
+        streams = [((int(line.split("\t", 1)[0]), line) for line in reader) for reader in readers]
+        for _, line in heapq.merge(*streams, key=lambda x: x[0]):
+            yield line
+    finally:
+        for reader, p in zip(readers, paths):
+            reader.close()
+            os.remove(p)
+
+def _dedup_spill(samples, path_set: PathSet, memory_limit_mb: float, spill_dir: Optional[str],
+                 keep_order: bool):
+    """
+    超内存去重，保留每个键第一次出现的记录：
+      1. 先在内存中用 DigestSet 去重并直接输出，直到键数超出预算；
+      2. 超出后把已见过的摘要作为标记写入各桶，释放内存，之后的记录（带序号）按摘要哈希写入 64 个桶；
+      3. 逐桶去重（仍超预算的桶递归细分）；keep_order=True 时各桶结果按序号多路归并，恢复原始顺序。
+    """
+    codec = get_codec()
+    max_keys = max(1, int(memory_limit_mb * 1024 * 1024 / _SPILL_BYTES_PER_KEY))
+
+    it = iter(samples)
+    seen = DigestSet()
+    for sample in it:
+        if seen.add(_key_digest(_extract_key(sample, path_set))):
+            yield sample
+            if len(seen) >= max_keys:
+                break
+    else:
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix="dedup-spill-", dir=spill_dir)
+    try:
+        logger.info(f"[超内存去重] 内存中的键数达到上限 {max_keys}，后续记录落盘到 {tmp_dir}")
+        buckets = _SpillBuckets(tmp_dir, "bucket", 0)
+        for digest in seen:
+            buckets.write(digest, f"-\t{digest.hex()}\n")
+        del seen
+        spilled = 0
+        for seq, sample in enumerate(it):
+            digest = _key_digest(_extract_key(sample, path_set))
+            buckets.write(digest, f"{seq}\t{digest.hex()}\t{codec.dumps(sample)}\n")
+            spilled += 1
+        buckets.close()
+        logger.info(f"[超内存去重] 落盘记录 {spilled} 条，开始逐桶去重")
+
+        leaves = (leaf for path, count in zip(buckets.paths, buckets.counts)
+                  for leaf in _iter_spill_leaves(path, count, 1, max_keys, tmp_dir))
+        if not keep_order:
+            for leaf in leaves:
+                for _, raw in _iter_spill_first(leaf):
+                    yield codec.loads(raw)
+            return
+
+        # 每个桶的结果先写回磁盘（已按序号有序），再按序号多路归并
+        kept_paths = []
+        for leaf in leaves:
+            kept_path = leaf + ".kept"
+            with open(kept_path, "w", encoding="utf-8") as writer:
+                for seq, raw in _iter_spill_first(leaf):
+                    writer.write(f"{seq}\t{raw}\n")
+            kept_paths.append(kept_path)
+        # 桶很多时分批归并，避免同时打开的文件数超出系统限制
+        while len(kept_paths) > _SPILL_MERGE_FANIN:
+            merged_paths = []
+            for i in range(0, len(kept_paths), _SPILL_MERGE_FANIN):
+                merged_path = os.path.join(tmp_dir, f"merged_{len(kept_paths)}_{i}")
+                with open(merged_path, "w", encoding="utf-8") as writer:
+                    writer.writelines(_merge_kept_files(kept_paths[i:i + _SPILL_MERGE_FANIN]))
+                merged_paths.append(merged_path)
+            kept_paths = merged_paths
+        for line in _merge_kept_files(kept_paths):
+            yield codec.loads(line.split("\t", 1)[1])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+# ==================== 外部去重的持久化键索引 ====================
+
+def _key_hash64(key: tuple) -> int:
+    """
+    去重键 -> 64 位哈希（blake2b），跨进程稳定，可以落盘复用。
+    """
+    return int.from_bytes(hashlib.blake2b(_key_bytes(key), digest_size=8).digest(), "little")
+
+def _dedup_index_tag(key_paths: List[str]) -> str:
+    return "dedup:" + json.dumps(list(key_paths), ensure_ascii=False)
+
+def _scan_key_hashes(path: str, path_set: PathSet) -> array:
+    loads = get_codec().loads
+    hashes = set()
+    with open_text(path) as reader:
+        for line in reader:
+            try:
+                hashes.add(_key_hash64(_extract_key(loads(line), path_set)))
+            except Exception:
+                continue
+    return array("Q", sorted(hashes))
+
+class DedupIndex:
+    """
+    外部去重库的键索引：所有黑名单文件去重键的 64 位哈希，合并为一个有序 array('Q')，
+    成员判断用二分查找，每个键只占 8 字节。
+    哈希碰撞会把不重复的样本误判为重复，概率约为 黑名单键数 / 2^64（1 亿个键时约 5e-12），可以忽略。
+    """
+
+    def __init__(self, key_paths: List[str], hashes: array, file_count: int = 0):
+        self.key_paths = list(key_paths)
+        self.hashes = hashes
+        self.file_count = file_count
+        self._path_set = compile_paths(tuple(key_paths))
+
+    def contains_key(self, key: tuple) -> bool:
+        h = _key_hash64(key)
+        hashes = self.hashes
+        i = bisect_left(hashes, h)
+        return i < len(hashes) and hashes[i] == h
+
+    def __contains__(self, sample: Any) -> bool:
+        """
+        sample 为原始记录，按 key_paths 提取去重键后判断。
+        """
+        return self.contains_key(_extract_key(sample, self._path_set))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __repr__(self) -> str:
+        return f"<DedupIndex files={self.file_count} keys={len(self)} key_paths={self.key_paths!r}>"
+
+def _build_dedup_index(target_file_paths: List[str], key_paths: List[str], rebuild: bool = False) -> DedupIndex:
+    path_set = compile_paths(tuple(key_paths))
+    tag = _dedup_index_tag(key_paths)
+    per_file = []
+    rebuilt = 0
+    for tfp in target_file_paths:
+        signature = _file_signature(tfp)
+        sidecar = _index_sidecar_path(tfp, tag)
+        loaded = None if rebuild else _load_sidecar(sidecar, signature, tag)
+        if loaded is None:
+            hashes = _scan_key_hashes(tfp, path_set)
+            _save_sidecar(sidecar, {"version": _INDEX_VERSION, "key_path": tag, "hash": "blake2b-64",
+                                    "keys": len(hashes), **signature}, hashes.tobytes())
+            rebuilt += 1
+        else:
+            hashes = array("Q")
+            hashes.frombytes(loaded[1])
+        per_file.append(hashes)
+
+    # 每个文件的哈希已排好序，多路归并即可，不需要整体重新排序
+    merged = per_file[0] if len(per_file) == 1 else array("Q", heapq.merge(*per_file))
+    logger.info(f"[外部去重] 键索引就绪: {len(target_file_paths)} 个文件 (重建 {rebuilt} 个)，共 {len(merged)} 个键")
+    return DedupIndex(key_paths, merged, file_count=len(target_file_paths))
+
+def build_dedup_index(target_file_patterns: Union[str, List[str]], key_paths: Union[str, List[str]],
+                      rebuild: bool = False) -> DedupIndex:
+    """
+    构建（或加载已持久化的）外部去重键索引。
+    每个黑名单文件旁生成一个隐藏的索引文件（与 build_jsonl_index 相同的放置与失效规则），
+    只有新增或大小 / mtime 变化过的文件会重新扫描，其余直接读取索引。
+    :param rebuild: 忽略已有索引文件，强制重建
+    """
+    if isinstance(target_file_patterns, str):
+        target_file_patterns = [target_file_patterns]
+    if isinstance(key_paths, str):
+        key_paths = [key_paths]
+    target_file_paths = sorted(set(p for tfp in target_file_patterns for p in glob_data_files(tfp)))
+    return _build_dedup_index(target_file_paths, key_paths, rebuild=rebuild)
+
+def remove_duplicates_exterior(samples, target_file_patterns, key_paths, persist_index: bool = False,
+                               hash_keys: bool = False):
     """
     外部根据字段去重（读取 target_file_patterns 中的数据建立黑名单）
+    黑名单文件支持 .gz / .zst 压缩格式
+    :param persist_index: 为 True 时使用 build_dedup_index 的持久化键索引，
+                          黑名单文件不变时不再重复解析，内存占用为每个键 8 字节（基于哈希，碰撞概率见 DedupIndex）
+    :param hash_keys: 不使用持久化索引时，黑名单在内存中只保存去重键的 128 位摘要（见 remove_duplicates_interior）
     """
     if isinstance(target_file_patterns, str):
         target_file_patterns = [target_file_patterns]
     if isinstance(key_paths, str):
         key_paths = [key_paths]
+    path_set = compile_paths(tuple(key_paths))
         
     target_file_paths = []
     for tfp in target_file_patterns:
-        matched = glob.glob(tfp, recursive=True)
+        matched = glob_data_files(tfp)
         if not matched:
             # [日志点 1]：黑名单路径写错了，这很危险，会导致去重失效
             logger.warning(f"[外部去重] 目标文件模式未匹配到任何文件: {tfp}")
@@ -63,36 +433,126 @@ def remove_duplicates_exterior(samples, target_file_patterns, key_paths):
     # [日志点 2]：告知用户正在进行高耗时操作
     if target_file_paths:
         logger.info(f"[外部去重] 开始加载去重库，共 {len(target_file_paths)} 个文件...")
-    
-    target_key_set = set()
-    loaded_count = 0
-    # 预加载黑名单
-    for tfp in sorted(target_file_paths):
-        with open(tfp, "r", encoding="utf-8") as reader:
-            for l in reader:
-                try:
-                    l_json = json.loads(l)
-                    key_list = []
-                    for path in key_paths:
-                        v_str = _extract_key_value(l_json, path)
-                        key_list.append(v_str)
-                    target_key_set.add(tuple(key_list))
-                    loaded_count += 1
-                except Exception:
-                    continue
-    logger.info(f"[外部去重] 去重库加载完成。包含 {len(target_key_set)} 个唯一键 (原始记录 {loaded_count} 条)")
+
+    if persist_index and target_file_paths:
+        dedup_index = _build_dedup_index(target_file_paths, key_paths)
+        is_duplicate = dedup_index.contains_key
+    else:
+        target_key_set, to_key = _make_seen(hash_keys)
+        loaded_count = 0
+        # 预加载黑名单
+        for tfp in sorted(target_file_paths):
+            with open_text(tfp) as reader:
+                for l in reader:
+                    try:
+                        l_json = json.loads(l)
+                        key_tuple = _extract_key(l_json, path_set)
+                        target_key_set.add(key_tuple if to_key is None else to_key(key_tuple))
+                        loaded_count += 1
+                    except Exception:
+                        continue
+        logger.info(f"[外部去重] 去重库加载完成。包含 {len(target_key_set)} 个唯一键 (原始记录 {loaded_count} 条)")
+        if to_key is None:
+            is_duplicate = target_key_set.__contains__
+        else:
+            is_duplicate = lambda key_tuple: to_key(key_tuple) in target_key_set
 
     # 过滤流
     duplicate_count = 0
     yield_count = 0
     for sample in samples:
-        key_list = []
-        for path in key_paths:
-            v_str = _extract_key_value(sample, path)
-            key_list.append(v_str)
-        
-        if tuple(key_list) not in target_key_set:
+        if not is_duplicate(_extract_key(sample, path_set)):
             yield_count += 1
             yield sample
         else:
-            duplicate_count += 1
\ No newline at end of file
+            duplicate_count += 1
+
+# ==================== 近似去重 (MinHash + LSH) ====================
+
+def _near_dup_text(item: Any, path_set: PathSet) -> str:
+    vals = path_set.get_all(item)
+    return normalize_question_text("\n".join(str(v) for vs in vals for v in vs if v is not None))
+
+def _text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def remove_near_duplicates_interior(samples, key_paths: Union[str, List[str]], threshold: float = 0.8,
+                                    num_perm: int = 128, ngram: int = 3):
+    """
+    内部近似去重：key_paths 对应的文本（多个值换行拼接）经 normalize_question_text 规范化后，
+    与之前保留的记录按字符 ngram 的 MinHash 估计 Jaccard 相似度 >= threshold 的丢弃。
+    规范化后完全相同的文本直接按摘要判重，不走 LSH。规范化后为空的记录不参与近似去重，原样保留。
+    需要安装 numpy。
+    :param threshold: 相似度阈值，越高越严格
+    :param num_perm: MinHash 签名长度，越长估计越准、越慢
+    """
+    if isinstance(key_paths, str):
+        key_paths = [key_paths]
+    path_set = compile_paths(tuple(key_paths))
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, ngram=ngram)
+    exact = set()
+    exact_count = near_count = 0
+    for sample in samples:
+        text = _near_dup_text(sample, path_set)
+        if not text:
+            yield sample
+            continue
+        digest = _text_digest(text)
+        if digest in exact:
+            exact_count += 1
+            continue
+        sig = lsh.signature(text)
+        if lsh.query(sig):
+            near_count += 1
+            continue
+        exact.add(digest)
+        lsh.insert(len(lsh), sig)
+        yield sample
+    logger.info(f"[近似去重] 完成。保留 {len(lsh)} 条，规范化后相同 {exact_count} 条，近似重复 {near_count} 条")
+
+def remove_near_duplicates_exterior(samples, target_file_patterns, key_paths: Union[str, List[str]],
+                                    threshold: float = 0.8, num_perm: int = 128, ngram: int = 3):
+    """
+    外部近似去重：用 target_file_patterns 中的数据建立 LSH 索引，与其中任意一条近似重复的样本丢弃。
+    判定规则同 remove_duplicates_exterior / remove_near_duplicates_interior，样本之间不互相去重。
+    """
+    if isinstance(target_file_patterns, str):
+        target_file_patterns = [target_file_patterns]
+    if isinstance(key_paths, str):
+        key_paths = [key_paths]
+    path_set = compile_paths(tuple(key_paths))
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, ngram=ngram)
+    exact = set()
+
+    target_file_paths = []
+    for tfp in target_file_patterns:
+        matched = glob_data_files(tfp)
+        if not matched:
+            logger.warning(f"[近似去重] 目标文件模式未匹配到任何文件: {tfp}")
+        target_file_paths.extend(matched)
+    logger.info(f"[近似去重] 开始建立外部语料索引，共 {len(target_file_paths)} 个文件...")
+    loads = get_codec().loads
+    for tfp in sorted(target_file_paths):
+        with open_text(tfp) as reader:
+            for line in reader:
+                try:
+                    text = _near_dup_text(loads(line), path_set)
+                except Exception:
+                    continue
+                if not text:
+                    continue
+                digest = _text_digest(text)
+                if digest in exact:
+                    continue
+                exact.add(digest)
+                lsh.insert(len(lsh), lsh.signature(text))
+    logger.info(f"[近似去重] 外部语料索引完成，共 {len(lsh)} 条不同文本")
+
+    duplicate_count = 0
+    for sample in samples:
+        text = _near_dup_text(sample, path_set)
+        if text and (_text_digest(text) in exact or lsh.query(lsh.signature(text))):
+            duplicate_count += 1
+            continue
+        yield sample
+    logger.info(f"[近似去重] 过滤完成，丢弃近似重复 {duplicate_count} 条")
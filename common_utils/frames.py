@@ -0,0 +1,178 @@
+"""
+checkpoint 中间文件的二进制帧格式（.frames / .frames.gz / .frames.zst）。
+
+stage 之间的中间文件不给人看，没必要每次都按 JSONL 文本重新解析。
+路径以 .frames 结尾（可再加 .gz / .zst 压缩后缀）时，read_jsonl / save_jsonl / JsonlWriter / checkpoint_to_file
+自动按帧格式读写，生成器接口不变。
+
+文件结构：
+  文件头 8 字节: b"CUFR" + 版本号 1 字节 + 3 字节保留
+  之后每条记录一帧: 4 字节小端长度 N + N 字节负载；负载首字节为编码类型，其余为记录本身
+    - 0: msgpack（msgspec 编码，需要安装 msgspec）
+    - 1: JSON UTF-8（未安装 msgspec，或记录含 msgpack 无法表示的超大整数时使用）
+与 JSONL 的差异：msgpack 会保留非字符串的字典键（JSON 会转成字符串），这类记录读回时键类型与写入一致。
+
+查看内容或与 JSONL 互转：
+    python -m common_utils.frames input.frames output.json
+"""
+import logging
+import struct
+from typing import Any, Callable, Generator, Optional, Tuple, Union
+
+from .codec import JsonCodec, _projection_struct, get_codec
+from .manipulation import _project
+from .paths import compile_projection
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+FRAMES_SUFFIX = ".frames"
+FRAMES_VERSION = 1
+FRAMES_HEADER = b"CUFR" + bytes([FRAMES_VERSION, 0, 0, 0])
+
+_KIND_MSGPACK = 0
+_KIND_JSON = 1
+_LEN = struct.Struct("<I")
+# 一次从文件读取的字节数；单帧超过它时按帧长度补读
+_READ_CHUNK = 4 * 1024 * 1024
+
+def is_frames_path(path) -> bool:
+    """
+    xxx.frames / xxx.frames.gz / xxx.frames.zst -> True
+    """
+    name = str(path).lower()
+    for suffix in (".gz", ".zst"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.endswith(FRAMES_SUFFIX)
+
+class FrameEncoder:
+    """
+    记录 -> 帧 bytes（含长度前缀）。
+    """
+
+    def __init__(self, codec: Optional[Union[str, JsonCodec]] = None):
+        self._dumps = get_codec(codec).dumps
+        self._msgpack = msgspec.msgpack.Encoder() if msgspec is not None else None
+
+    def encode(self, sample: Any) -> bytes:
+        if self._msgpack is not None:
+            try:
+                payload = self._msgpack.encode(sample)
+                return _LEN.pack(len(payload) + 1) + b"\x00" + payload
+            except OverflowError:
+                # 超出 64 位的整数，交给 JSON
+                pass
+        payload = self._dumps(sample).encode("utf-8")
+        return _LEN.pack(len(payload) + 1) + b"\x01" + payload
+
+def _make_frame_loads(codec: JsonCodec, fields: Optional[Tuple[str, ...]]) -> Callable[[memoryview], Any]:
+    """
+    负载（含类型字节）-> 记录。设置 fields 时 msgpack 负载按投影树动态生成 Struct 部分解码，与 JsonCodec.projected_loads 一致。
+    """
+    json_loads = codec.loads if fields is None else codec.projected_loads(fields)
+    tree = compile_projection(tuple(fields)) if fields is not None else None
+    if msgspec is None:
+        mp_loads = None
+    elif tree is None:
+        mp_loads = msgspec.msgpack.Decoder().decode
+    else:
+        full_decode = msgspec.msgpack.Decoder().decode
+        decode = msgspec.msgpack.Decoder(_projection_struct(tree)).decode
+        to_builtins = msgspec.to_builtins
+
+        def mp_loads(data):
+            try:
+                return to_builtins(decode(data))
+            except Exception:
+                obj = full_decode(data)
+                return _project(obj, tree) if isinstance(obj, dict) else obj
+
+    def loads(payload: memoryview) -> Any:
+        kind = payload[0]
+        if kind == _KIND_MSGPACK:
+            if mp_loads is None:
+                raise ImportError("读取 msgpack 帧需要安装 msgspec")
+            return mp_loads(payload[1:])
+        if kind == _KIND_JSON:
+            return json_loads(bytes(payload[1:]))
+        raise ValueError(f"未知的帧类型: {kind}")
+    return loads
+
+# 解码失败的帧
+_BAD = object()
+
+def iter_frames_stream(reader, path: str, ignore_errors: bool, codec: JsonCodec,
+                       fields: Optional[Tuple[str, ...]] = None) -> Generator[Any, None, None]:
+    """
+    从二进制流中逐帧解码。单帧解码失败时与 JSONL 的坏行一样跳过并打印 Warning；
+    末尾的半截帧（写入中断）同样跳过。
+    """
+    header = reader.read(len(FRAMES_HEADER))
+    if not header:
+        return
+    if header[:4] != FRAMES_HEADER[:4]:
+        raise ValueError(f"不是 frames 格式的文件: {path}")
+    if header[4] != FRAMES_VERSION:
+        raise ValueError(f"不支持的 frames 版本 {header[4]}: {path}")
+
+    loads = _make_frame_loads(codec, fields)
+    unpack_len = _LEN.unpack_from
+    buf = b""
+    view = memoryview(buf)
+    pos = 0
+    frame_num = 0
+    while True:
+        # 缓冲区里凑不齐一帧时补读
+        if len(buf) - pos < 4:
+            chunk = reader.read(_READ_CHUNK)
+            if not chunk:
+                break
+            buf = buf[pos:] + chunk
+            view = memoryview(buf)
+            pos = 0
+            continue
+        (size,) = unpack_len(buf, pos)
+        end = pos + 4 + size
+        if end > len(buf):
+            chunk = reader.read(max(_READ_CHUNK, end - len(buf)))
+            if not chunk:
+                break
+            buf = buf[pos:] + chunk
+            view = memoryview(buf)
+            pos = 0
+            continue
+
+        frame_num += 1
+        try:
+            record = loads(view[pos + 4:end])
+        except ImportError:
+            raise
+        except Exception as e:
+            if not ignore_errors:
+                logger.warning(f"帧解析失败 [{path}:Frame {frame_num}]: {e}")
+            record = _BAD
+        pos = end
+        if record is not _BAD:
+            yield record
+
+    if len(buf) > pos and not ignore_errors:
+        logger.warning(f"文件末尾有不完整的帧（写入中断？），已跳过 {len(buf) - pos} 字节: {path}")
+
+def main():
+    import argparse
+    from .io import convert_records
+
+    parser = argparse.ArgumentParser(description="JSONL 与 frames 格式互转，格式按后缀判断")
+    parser.add_argument("src", nargs="+", help="输入文件（支持 glob 模式）")
+    parser.add_argument("dst", help="输出文件，如 out.json / out.frames.zst")
+    args = parser.parse_args()
+    convert_records(args.src, args.dst)
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,808 @@
 import glob
+import gzip
+import io
+import itertools
 import json
 import logging
+import mmap
+import os
+import re
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import List, Union, Generator, Any
+from typing import Callable, Iterable, List, Optional, Tuple, Union, Generator, Any
 
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter  # 核心修复：支持无限列名
 import tqdm
 
+try:
+    import zstandard
+except ImportError:  # 可选依赖，仅读写 .zst 文件时需要
+    zstandard = None
+
+from .codec import JsonCodec, get_codec
+from .frames import FRAMES_HEADER, FrameEncoder, is_frames_path, iter_frames_stream
+from .manipulation import get_values_by_key_path
+
+_MISSING = object()
+
 # 设置简单的日志打印，避免数据静默丢失
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
 
-def read_jsonl(path_patterns: Union[str, List[str]], ignore_errors: bool = False) -> Generator[Any, None, None]:
+# ==================== 压缩文件支持 ====================
+
+COMPRESSION_SUFFIXES = (".gz", ".zst")
+# 压缩参数默认值，可在调用处覆盖
+DEFAULT_COMPRESS_LEVEL = {".gz": 6, ".zst": 3}
+DEFAULT_COMPRESS_THREADS = 0
+
+def _compression_of(path: Union[str, Path]) -> Optional[str]:
+    suffix = Path(path).suffix.lower()
+    return suffix if suffix in COMPRESSION_SUFFIXES else None
+
+def open_text(path: Union[str, Path], mode: str = "r", compress_level: Optional[int] = None,
+              compress_threads: Optional[int] = None):
     """
-    读取 JSONL 文件。
-    :param ignore_errors: 是否忽略解析错误的行（默认为 False，会打印 Warning）
+    按后缀打开文本文件：.gz / .zst 流式压缩解压，其他后缀按普通文件处理。
+    读取时 errors="replace"，与 read_jsonl 的容错策略一致。
+    :param mode: "r" / "w" / "a"
+    :param compress_level: 压缩级别，默认 gzip=6，zstd=3
+    :param compress_threads: zstd 压缩线程数，0 为单线程，-1 为按 CPU 数自动（gzip 不支持多线程，忽略）
+    """
+    if mode not in ("r", "w", "a"):
+        raise ValueError(f'open_text mode 必须是 "r" / "w" / "a"，当前是: {mode!r}')
+    errors = "replace" if mode == "r" else "strict"
+    compression = _compression_of(path)
+
+    if compression is None:
+        return open(path, mode, encoding="utf-8", errors=errors)
+
+    level = DEFAULT_COMPRESS_LEVEL[compression] if compress_level is None else compress_level
+    if compression == ".gz":
+        return gzip.open(path, mode + "t", compresslevel=level, encoding="utf-8", errors=errors)
+
+    if zstandard is None:
+        raise ImportError(f"读写 .zst 文件需要安装 zstandard: {path}")
+    if mode == "r":
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+    else:
+        threads = DEFAULT_COMPRESS_THREADS if compress_threads is None else compress_threads
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads)
+        # 追加模式会在文件后面再接一个 zstd frame，解压时按多 frame 读取
+        stream = compressor.stream_writer(open(path, mode + "b"), closefd=True)
+    return io.TextIOWrapper(stream, encoding="utf-8", errors=errors)
+
+def _open_binary_writer(path: Union[str, Path], compression: Optional[str], buffer_size: int,
+                        compress_level: Optional[int] = None, compress_threads: Optional[int] = None,
+                        fsync: bool = False):
+    """
+    以二进制写模式打开文件，compression 由调用方指定（写临时文件时后缀与最终路径不同）。
+    :param fsync: True 时 close() 在压缩层写完结尾之后、关闭文件之前 fsync 底层文件
+    """
+    raw = open(path, "wb", buffering=buffer_size)
+    if compression is None:
+        return _ClosingStack(raw, fsync=True) if fsync else raw
+    level = DEFAULT_COMPRESS_LEVEL[compression] if compress_level is None else compress_level
+    if compression == ".gz":
+        # GzipFile 不会关闭传入的 fileobj，这里把两者一起交给调用方关闭
+        return _ClosingStack(gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level), raw, fsync=fsync)
+    if zstandard is None:
+        raw.close()
+        raise ImportError(f"读写 .zst 文件需要安装 zstandard: {path}")
+    threads = DEFAULT_COMPRESS_THREADS if compress_threads is None else compress_threads
+    compressor = zstandard.ZstdCompressor(level=level, threads=threads)
+    return _ClosingStack(compressor.stream_writer(raw, closefd=False), raw, fsync=fsync)
+
+def _open_binary_reader(path: Union[str, Path]):
+    """
+    以二进制读模式打开文件，按后缀透明解压。
+    """
+    compression = _compression_of(path)
+    if compression is None:
+        return open(path, "rb")
+    if compression == ".gz":
+        return gzip.open(path, "rb")
+    if zstandard is None:
+        raise ImportError(f"读写 .zst 文件需要安装 zstandard: {path}")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+
+class _ClosingStack:
+    """
+    写入委托给第一个流，close / fileno 时依次处理所有流（最后一个为底层文件）。
+    fsync=True 时先关闭上层的压缩流（gzip 尾部、zstd frame 结尾此时才写出），再 fsync 底层文件，最后关闭它。
+    """
+
+    def __init__(self, stream, *underlying, fsync: bool = False):
+        self._stream = stream
+        self._underlying = underlying
+        self._fsync = fsync
+
+    def write(self, data: bytes) -> int:
+        return self._stream.write(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
+        for u in self._underlying:
+            u.flush()
+
+    def fileno(self) -> int:
+        return (self._underlying or (self._stream,))[-1].fileno()
+
+    def close(self) -> None:
+        layers = (self._stream,) + self._underlying
+        raw = layers[-1]
+        try:
+            for layer in layers[:-1]:
+                layer.close()
+            if self._fsync and not raw.closed:
+                raw.flush()
+                os.fsync(raw.fileno())
+        finally:
+            raw.close()
+
+def glob_data_files(path_pattern: str) -> List[str]:
+    """
+    glob 匹配数据文件，同时匹配其 .gz / .zst 压缩版本，使原有的 "part*.json" 这类模式对压缩文件同样有效。
+    同一份数据同时存在明文和压缩版本时只取明文，避免重复读取。
+    """
+    matched = set(glob.glob(path_pattern, recursive=True))
+    if _compression_of(path_pattern) is None:
+        for suffix in COMPRESSION_SUFFIXES:
+            for p in glob.glob(path_pattern + suffix, recursive=True):
+                if p[:-len(suffix)] not in matched:
+                    matched.add(p)
+    # glob 排序确保处理顺序可复现
+    return sorted(matched)
+
+def _expand_path_patterns(path_patterns: Union[str, List[str]]) -> List[str]:
+    """
+    展开 glob 模式，返回按模式顺序、模式内排序后的文件列表。
     """
     if isinstance(path_patterns, str):
         path_patterns = [path_patterns]
-    
-    total_files = 0
-    for path_pattern in path_patterns:
-        # glob 排序确保处理顺序可复现
-        path_list = sorted(glob.glob(path_pattern, recursive=True))
 
+    all_paths = []
+    for path_pattern in path_patterns:
+        path_list = glob_data_files(path_pattern)
         if not path_list:
             logger.warning(f"路径模式未匹配到任何文件: {path_pattern}")
             continue
+        all_paths.extend(path_list)
+    return all_paths
 
-        total_files += len(path_list)
-        for path in path_list:
-            line_count = 0
-            # errors="replace" 防止遇到非 utf-8 字符直接崩溃
-            with open(path, encoding="utf-8", errors="replace") as reader:
-                for line_num, line in enumerate(reader, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        line_json = json.loads(line)
-                        line_count += 1
-                        yield line_json
-                    except json.JSONDecodeError as e:
-                        if not ignore_errors:
-                            logger.warning(f"JSON解析失败 [{path}:Line {line_num}]: {e}")
-                        continue
-                    except Exception as e:
-                        if not ignore_errors:
-                            logger.warning(f"读取异常 [{path}:Line {line_num}]: {e}")
-                        continue
-            # 读完一个文件打印统计，确认文件不是空的
-            logger.debug(f"文件读取完成: {path} (行数: {line_count})")
-    if total_files == 0:
+def _make_loads(codec: JsonCodec, fields: Optional[Tuple[str, ...]]):
+    return codec.loads if fields is None else codec.projected_loads(fields)
+
+def json_text_fragments(text: str) -> Tuple[bytes, bytes]:
+    """
+    返回 text 出现在 JSON 字符串值内部时在原始文件中的两种字节形式（用作 read_jsonl 的 prefilter）：
+    非 ASCII 字符原样 UTF-8（ensure_ascii=False 写出的文件）与 \\uXXXX 转义（ensure_ascii=True 写出的文件）。
+    引号、反斜杠、换行等按 JSON 规则转义，例如 '"审核结果": "不合格"' -> b'\\"审核结果\\": \\"不合格\\"'。
+    """
+    return (json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8"),
+            json.dumps(text, ensure_ascii=True)[1:-1].encode("utf-8"))
+
+def _make_raw_test(prefilter):
+    """
+    prefilter -> 作用于原始行 bytes 的判定函数。支持：
+      - str / bytes：子串
+      - list / tuple：其中任意一个子串命中即可
+      - 编译好的正则：bytes 正则直接匹配；str 正则先把行解码再匹配
+    """
+    if prefilter is None:
+        return None
+    if isinstance(prefilter, re.Pattern):
+        if isinstance(prefilter.pattern, bytes):
+            return lambda raw: prefilter.search(raw) is not None
+        return lambda raw: prefilter.search(raw.decode("utf-8", errors="replace")) is not None
+    if isinstance(prefilter, (str, bytes)):
+        prefilter = (prefilter,)
+    needles = tuple(p.encode("utf-8") if isinstance(p, str) else p for p in prefilter)
+    if len(needles) == 1:
+        needle = needles[0]
+        return lambda raw: needle in raw
+    return lambda raw: any(n in raw for n in needles)
+
+def _iter_frames_file(path: str, ignore_errors: bool, codec: JsonCodec,
+                      fields: Optional[Tuple[str, ...]] = None) -> Generator[Any, None, None]:
+    """
+    顺序读取单个 frames 文件，见 common_utils.frames。
+    """
+    with _open_binary_reader(path) as reader:
+        yield from iter_frames_stream(reader, path, ignore_errors, codec, fields)
+
+def _iter_jsonl_file(path: str, ignore_errors: bool, codec: JsonCodec,
+                     fields: Optional[Tuple[str, ...]] = None, prefilter=None) -> Generator[Any, None, None]:
+    """
+    顺序读取单个 JSONL 文件。frames 文件按帧格式读取。
+    """
+    if is_frames_path(path):
+        yield from _iter_frames_file(path, ignore_errors, codec, fields)
+        return
+    loads = _make_loads(codec, fields)
+    raw_test = _make_raw_test(prefilter)
+    line_count = 0
+    # errors="replace" 防止遇到非 utf-8 字符直接崩溃
+    with open_text(path) as reader:
+        for line_num, line in enumerate(reader, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if raw_test is not None and not raw_test(line.encode("utf-8")):
+                continue
+            try:
+                line_json = loads(line)
+                line_count += 1
+                yield line_json
+            except json.JSONDecodeError as e:
+                if not ignore_errors:
+                    logger.warning(f"JSON解析失败 [{path}:Line {line_num}]: {e}")
+                continue
+            except Exception as e:
+                if not ignore_errors:
+                    logger.warning(f"读取异常 [{path}:Line {line_num}]: {e}")
+                continue
+    # 读完一个文件打印统计，确认文件不是空的
+    logger.debug(f"文件读取完成: {path} (行数: {line_count})")
+
+def _loads_bytes(raw: bytes, loads) -> Any:
+    """
+    直接把 bytes 交给解码器，省去 decode + strip 产生的中间字符串（JSON 允许首尾空白）。
+    解析失败时（如非法 UTF-8）回退到与文本模式一致的 decode(errors="replace") + strip 路径。
+    """
+    try:
+        return loads(raw)
+    except Exception:
+        return loads(raw.decode("utf-8", errors="replace").strip())
+
+# mmap 模式下每处理这么多字节就释放一次已读页面，避免整个文件的页面都计入 RSS
+_MMAP_RELEASE_BYTES = 16 * 1024 * 1024
+
+def _iter_jsonl_file_mmap(path: str, ignore_errors: bool, codec: JsonCodec,
+                          fields: Optional[Tuple[str, ...]] = None, prefilter=None) -> Generator[Any, None, None]:
+    """
+    以 mmap 方式读取单个 JSONL 文件：用 bytes.find 按换行切分，bytes 切片直接交给解码器。
+    压缩文件无法 mmap，回退到文本模式。
+    """
+    if _compression_of(path) is not None or is_frames_path(path):
+        yield from _iter_jsonl_file(path, ignore_errors, codec, fields, prefilter)
+        return
+
+    loads = _make_loads(codec, fields)
+    raw_test = _make_raw_test(prefilter)
+    line_count = 0
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            find = mm.find
+            can_release = hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+            released = 0
+            pos = 0
+            line_num = 0
+            while pos < size:
+                nl = find(b"\n", pos)
+                if nl == -1:
+                    nl = size
+                line = mm[pos:nl]
+                pos = nl + 1
+                line_num += 1
+
+                if can_release and pos - released >= _MMAP_RELEASE_BYTES:
+                    length = (pos - released) // mmap.PAGESIZE * mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, released, length)
+                    released += length
+
+                if not line or line.isspace():
+                    continue
+                if raw_test is not None and not raw_test(line):
+                    continue
+                try:
+                    line_json = _loads_bytes(line, loads)
+                    line_count += 1
+                    yield line_json
+                except json.JSONDecodeError as e:
+                    if not ignore_errors:
+                        logger.warning(f"JSON解析失败 [{path}:Line {line_num}]: {e}")
+                    continue
+                except Exception as e:
+                    if not ignore_errors:
+                        logger.warning(f"读取异常 [{path}:Line {line_num}]: {e}")
+                    continue
+    logger.debug(f"文件读取完成: {path} (行数: {line_count})")
+
+def _split_file_ranges(path: str, chunk_bytes: int) -> List[Tuple[str, int, Optional[int]]]:
+    """
+    将文件按 chunk_bytes 切成若干 [start, end) 字节区间，区间边界对齐到换行符之后，
+    保证每个区间内都是完整的行。压缩文件与 frames 文件无法按换行切分，整个文件作为一个任务 (end=None)。
+    """
+    if _compression_of(path) is not None or is_frames_path(path):
+        return [(path, 0, None)]
+    size = os.path.getsize(path)
+    if size <= chunk_bytes:
+        return [(path, 0, size)]
+
+    ranges = []
+    start = 0
+    with open(path, "rb") as reader:
+        while start < size:
+            target = start + chunk_bytes
+            if target >= size:
+                end = size
+            else:
+                reader.seek(target)
+                reader.readline()  # 跳到下一个换行符之后
+                end = min(reader.tell(), size)
+            ranges.append((path, start, end))
+            start = end
+    return ranges
+
+def _parse_jsonl_range(path: str, start: int, end: Optional[int], ignore_errors: bool, codec: JsonCodec,
+                       fields: Optional[Tuple[str, ...]] = None, prefilter=None) -> List[Any]:
+    """
+    子进程任务：解析文件 [start, end) 区间内的所有行，返回记录列表。end=None 表示整个文件。
+    """
+    if end is None:
+        return list(_iter_jsonl_file(path, ignore_errors, codec, fields, prefilter))
+    loads = _make_loads(codec, fields)
+    raw_test = _make_raw_test(prefilter)
+    with open(path, "rb") as reader:
+        reader.seek(start)
+        data = reader.read(end - start)
+
+    records = []
+    offset = start
+    for raw in data.split(b"\n"):
+        line_offset = offset
+        offset += len(raw) + 1
+        if not raw or raw.isspace():
+            continue
+        if raw_test is not None and not raw_test(raw):
+            continue
+        try:
+            records.append(_loads_bytes(raw, loads))
+        except json.JSONDecodeError as e:
+            if not ignore_errors:
+                logger.warning(f"JSON解析失败 [{path}:Byte {line_offset}]: {e}")
+        except Exception as e:
+            if not ignore_errors:
+                logger.warning(f"读取异常 [{path}:Byte {line_offset}]: {e}")
+    return records
+
+def _read_jsonl_parallel(path_list: List[str], ignore_errors: bool, workers: int,
+                         ordered: bool, chunk_bytes: int, codec: JsonCodec,
+                         fields: Optional[Tuple[str, ...]] = None, prefilter=None) -> Generator[Any, None, None]:
+    """
+    多进程读取：文件列表与大文件的字节区间一起作为任务分发到进程池。
+    同时在途的任务数限制为 workers * 2，避免结果积压导致内存上涨。
+    """
+    tasks = []
+    for path in path_list:
+        tasks.extend(_split_file_ranges(path, chunk_bytes))
+    logger.debug(f"并行读取: {len(path_list)} 个文件切分为 {len(tasks)} 个任务 (workers={workers})")
+
+    max_in_flight = workers * 2
+    task_iter = iter(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def _submit_next():
+            task = next(task_iter, None)
+            if task is None:
+                return None
+            return executor.submit(_parse_jsonl_range, *task, ignore_errors, codec, fields, prefilter)
+
+        if ordered:
+            # 按提交顺序取结果，输出顺序与单进程完全一致
+            pending = deque()
+            for _ in range(max_in_flight):
+                future = _submit_next()
+                if future is None:
+                    break
+                pending.append(future)
+            while pending:
+                records = pending.popleft().result()
+                future = _submit_next()
+                if future is not None:
+                    pending.append(future)
+                yield from records
+        else:
+            # 谁先完成先输出谁
+            pending = set()
+            for _ in range(max_in_flight):
+                future = _submit_next()
+                if future is None:
+                    break
+                pending.add(future)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    nxt = _submit_next()
+                    if nxt is not None:
+                        pending.add(nxt)
+                    yield from future.result()
+
+def read_jsonl(path_patterns: Union[str, List[str]], ignore_errors: bool = False,
+               workers: Optional[int] = None, ordered: bool = True,
+               chunk_bytes: int = 32 * 1024 * 1024,
+               codec: Optional[Union[str, JsonCodec]] = None,
+               binary: bool = False,
+               fields: Optional[List[str]] = None,
+               prefilter=None, where: Optional[Callable[[Any], bool]] = None) -> Generator[Any, None, None]:
+    """
+    读取 JSONL 文件。
+    :param ignore_errors: 是否忽略解析错误的行（默认为 False，会打印 Warning）
+    :param workers: 进程数。None / 0 / 1 为单进程顺序读取；大于 1 时启用进程池，
+                    匹配到的文件以及超过 chunk_bytes 的大文件（按换行对齐的字节区间）会分发到各进程解析
+    :param ordered: 仅在 workers > 1 时有效。True 保证输出顺序与单进程一致；False 按完成顺序输出
+    :param chunk_bytes: 并行模式下单个任务的字节数上限
+    :param codec: JSON 解码后端，None 为自动选择（msgspec > orjson > json），见 common_utils.codec
+    :param binary: 单进程时使用 mmap + bytes 切分，跳过逐行 UTF-8 解码与 strip，仅对解析失败的行回退到文本解码
+                   （并行模式的子进程本身就按 bytes 解析）
+    :param fields: 只保留这些路径（语法同 get_values_by_key_path），如 [".topic_id", ".tran_script_operate_type"]，
+                   返回的精简记录对这些路径取值与完整记录一致。msgspec 后端按路径部分解码，
+                   其他后端完整解码后再裁剪，见 JsonCodec.projected_loads
+    :param prefilter: 解码前作用于原始行 bytes 的快速过滤，未命中的行直接跳过、不做 json 解析。
+                      可以是子串（str / bytes）、子串列表（任一命中）或编译好的正则。
+                      必须是保留条件的“必要条件”：可以误放（由 where 或下游再判断），不能误杀。
+                      字符串值内部的文本在原始行中是转义后的形式，可用 json_text_fragments 生成。
+                      设置后单进程读取自动走 binary 路径。不支持 frames 文件。
+    :param where: 解码后的精确判定，返回 False 的记录被丢弃，用于剔除 prefilter 的误放
+
+    路径以 .frames（.frames.gz / .frames.zst）结尾的文件按二进制帧格式读取，见 common_utils.frames。
+    """
+    codec = get_codec(codec)
+    if isinstance(fields, str):
+        fields = [fields]
+    fields = tuple(fields) if fields is not None else None
+    path_list = _expand_path_patterns(path_patterns)
+    if not path_list:
         logger.error("未找到任何符合条件的输入文件！生成器将为空。")
+        return
+    if prefilter is not None and any(is_frames_path(p) for p in path_list):
+        raise ValueError("prefilter 作用于 JSONL 原始行，不支持 frames 文件，请改用 where")
+
+    if workers is not None and workers > 1:
+        records = _read_jsonl_parallel(path_list, ignore_errors, workers, ordered, chunk_bytes,
+                                       codec, fields, prefilter)
+    else:
+        iter_file = _iter_jsonl_file_mmap if (binary or prefilter is not None) else _iter_jsonl_file
+        records = (r for path in path_list for r in iter_file(path, ignore_errors, codec, fields, prefilter))
+
+    if where is None:
+        yield from records
+    else:
+        for record in records:
+            if where(record):
+                yield record
+
+# ==================== 偏移量索引 (随机访问) ====================
+
+_INDEX_VERSION = 1
+
+def _index_sidecar_path(path: str, key_path: Optional[str] = None) -> Path:
+    """
+    索引文件放在数据文件旁边，以 "." 开头，避免被 "dir/*" 这类 glob 模式误读。
+      行偏移索引: dir/.part1.json.idx
+      键索引:     dir/.part1.json.topic_id.idx
+    """
+    p = Path(path)
+    if key_path is None:
+        return p.with_name(f".{p.name}.idx")
+    key_tag = re.sub(r"[^0-9A-Za-z_]+", "_", key_path).strip("_") or "root"
+    return p.with_name(f".{p.name}.{key_tag}.idx")
+
+def _file_signature(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _load_sidecar(sidecar: Path, signature: dict, key_path: Optional[str]) -> Optional[Tuple[dict, bytes]]:
+    """
+    读取索引文件，签名（文件大小 / mtime）不一致时返回 None，表示需要重建。
+    索引格式: 第一行为 JSON 元信息，之后是正文。
+    """
+    if not sidecar.exists():
+        return None
+    try:
+        with open(sidecar, "rb") as reader:
+            meta = json.loads(reader.readline())
+            body = reader.read()
+    except Exception as e:
+        logger.warning(f"[索引] 索引文件损坏，将重建 [{sidecar}]: {e}")
+        return None
+    if (meta.get("version") != _INDEX_VERSION or meta.get("key_path") != key_path
+            or meta.get("size") != signature["size"] or meta.get("mtime_ns") != signature["mtime_ns"]):
+        logger.info(f"[索引] 数据文件已变化，索引失效: {sidecar}")
+        return None
+    return meta, body
+
+def _save_sidecar(sidecar: Path, meta: dict, body: bytes) -> None:
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    try:
+        with open(tmp, "wb") as writer:
+            writer.write(json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n")
+            writer.write(body)
+        os.replace(tmp, sidecar)
+    except OSError as e:
+        # 目录不可写时只在内存中使用索引
+        logger.warning(f"[索引] 索引文件写入失败，仅本次有效 [{sidecar}]: {e}")
+
+class JsonlIndex:
+    """
+    JSONL 文件的字节偏移索引。
+    - offsets: 每条记录（非空行）的起始字节偏移，array('Q')，第 i 条记录即 offsets[i]
+    - keys:    可选，key_path 取值 -> 记录序号（重复的键保留第一次出现的位置）
+    """
+
+    def __init__(self, path: str, offsets: array, key_path: Optional[str] = None,
+                 keys: Optional[dict] = None):
+        self.path = path
+        self.offsets = offsets
+        self.key_path = key_path
+        self.keys = keys
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __repr__(self) -> str:
+        return f"<JsonlIndex {self.path} records={len(self)} key_path={self.key_path!r}>"
+
+def _scan_line_offsets(path: str) -> array:
+    offsets = array("Q")
+    offset = 0
+    with open(path, "rb") as reader:
+        for raw in reader:
+            if raw.strip():
+                offsets.append(offset)
+            offset += len(raw)
+    return offsets
+
+def _scan_key_index(path: str, offsets: array, key_path: str, codec: JsonCodec) -> dict:
+    loads = codec.loads
+    keys = {}
+    duplicate_count = 0
+    with open(path, "rb") as reader:
+        for line_no, offset in enumerate(offsets):
+            reader.seek(offset)
+            try:
+                vals = get_values_by_key_path(loads(reader.readline()), key_path)
+            except Exception:
+                continue
+            if not vals or vals[0] is None:
+                continue
+            key = str(vals[0])
+            if key in keys:
+                duplicate_count += 1
+                continue
+            keys[key] = line_no
+    if duplicate_count:
+        logger.warning(f"[索引] {path} 中 {key_path} 存在 {duplicate_count} 个重复值，lookup 只返回第一条")
+    return keys
+
+def build_jsonl_index(path: str, key_path: Optional[str] = None, rebuild: bool = False,
+                      codec: Optional[Union[str, JsonCodec]] = None) -> JsonlIndex:
+    """
+    构建（或加载已持久化的）JSONL 偏移索引。
+    数据文件的大小或 mtime 变化时，索引自动失效并重建。
+    :param key_path: 可选，额外建立 key_path 取值 -> 偏移 的映射，路径语法同 get_values_by_key_path
+    :param rebuild: 忽略已有索引文件，强制重建
+    """
+    if _compression_of(path) is not None:
+        raise ValueError(f"压缩文件无法按字节偏移随机访问，请先解压: {path}")
+    if is_frames_path(path):
+        raise ValueError(f"偏移索引只支持 JSONL 文件，frames 文件请先转换: {path}")
+    codec = get_codec(codec)
+    signature = _file_signature(path)
+
+    line_sidecar = _index_sidecar_path(path)
+    loaded = None if rebuild else _load_sidecar(line_sidecar, signature, None)
+    if loaded is None:
+        offsets = _scan_line_offsets(path)
+        _save_sidecar(line_sidecar, {"version": _INDEX_VERSION, "key_path": None,
+                                     "records": len(offsets), **signature}, offsets.tobytes())
+        logger.info(f"[索引] 行偏移索引已建立: {path} (记录数: {len(offsets)})")
+    else:
+        offsets = array("Q")
+        offsets.frombytes(loaded[1])
+
+    keys = None
+    if key_path is not None:
+        key_sidecar = _index_sidecar_path(path, key_path)
+        loaded = None if rebuild else _load_sidecar(key_sidecar, signature, key_path)
+        if loaded is None:
+            keys = _scan_key_index(path, offsets, key_path, codec)
+            _save_sidecar(key_sidecar, {"version": _INDEX_VERSION, "key_path": key_path, **signature},
+                          codec.dumps(keys).encode("utf-8"))
+            logger.info(f"[索引] 键索引已建立: {path} {key_path} (键数: {len(keys)})")
+        else:
+            keys = codec.loads(loaded[1])
+
+    return JsonlIndex(path, offsets, key_path=key_path, keys=keys)
+
+def _read_record_at(reader, offset: int, loads, path: str, ignore_errors: bool) -> Any:
+    reader.seek(offset)
+    raw = reader.readline()
+    try:
+        return loads(raw.decode("utf-8", errors="replace").strip())
+    except Exception as e:
+        if not ignore_errors:
+            logger.warning(f"JSON解析失败 [{path}:Byte {offset}]: {e}")
+        return _MISSING
+
+def read_jsonl_range(path: str, start: int = 0, end: Optional[int] = None, ignore_errors: bool = False,
+                     codec: Optional[Union[str, JsonCodec]] = None) -> Generator[Any, None, None]:
+    """
+    借助偏移索引直接定位，读取第 [start, end) 条记录（从 0 开始，语义同列表切片，只计非空行）。
+    """
+    codec = get_codec(codec)
+    index = build_jsonl_index(path, codec=codec)
+    start, end, _ = slice(start, end).indices(len(index))
+    if start >= end:
+        return
+    loads = codec.loads
+    with open(path, "rb") as reader:
+        reader.seek(index.offsets[start])
+        for offset in index.offsets[start:end]:
+            # 区间内是连续的行，顺序 readline 即可，跳过空行
+            raw = reader.readline()
+            while raw and not raw.strip():
+                raw = reader.readline()
+            try:
+                yield loads(raw.decode("utf-8", errors="replace").strip())
+            except Exception as e:
+                if not ignore_errors:
+                    logger.warning(f"JSON解析失败 [{path}:Byte {offset}]: {e}")
+
+def lookup(path: str, ids: Iterable[Any], key_path: str = ".topic_id", ignore_errors: bool = False,
+           codec: Optional[Union[str, JsonCodec]] = None) -> Generator[Any, None, None]:
+    """
+    借助键索引按 id 直接定位记录，按 ids 的顺序输出；不存在的 id 会被跳过并汇总打印。
+    :param key_path: 建立键索引使用的路径，默认 .topic_id
+    """
+    codec = get_codec(codec)
+    index = build_jsonl_index(path, key_path=key_path, codec=codec)
+    loads = codec.loads
+    missing_count = 0
+    with open(path, "rb") as reader:
+        for sample_id in ids:
+            line_no = index.keys.get(str(sample_id))
+            if line_no is None:
+                missing_count += 1
+                continue
+            record = _read_record_at(reader, index.offsets[line_no], loads, path, ignore_errors)
+            if record is not _MISSING:
+                yield record
+    if missing_count:
+        logger.warning(f"[索引] {path} 中有 {missing_count} 个 id 未找到 ({key_path})")
+
+# ==================== 大 JSON 文件流式解析 ====================
+
+_WS = " \t\n\r"
+_RAW_DECODER = json.JSONDecoder()
+# 数字与 true / false / null / NaN / Infinity 可能的后续字符：raw_decode 在这些字符前停下时，token 可能只是被截断了
+_TOKEN_CONT = frozenset("0123456789+-.eEabcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+# 解析错误位置距缓冲区末尾不超过这么多字符时，可能只是 token 被截断（"-Infinity"、"\\uXXXX\\uXXXX" 最长 12 个字符）
+_TRUNCATION_MARGIN = 16
+
+class _JsonStreamReader:
+    """
+    增量读取顶层为 object / array 的 JSON 文件，每次只把一个 key / value 交给 raw_decode。
+    缓冲区中已消费的部分会被及时丢弃，内存占用与单个元素的大小成正比，而不是整个文件。
+    """
+
+    def __init__(self, reader, chunk_size: int):
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self.reader.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # 丢弃已消费的部分，避免缓冲区无限增长
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        """
+        跳过空白并返回下一个字符（不消费），文件结束返回 ""。
+        """
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.next_char()
+        if not c or c not in chars:
+            raise json.JSONDecodeError(f"期望 {chars!r}，实际为 {c!r}", self.buf, self.pos)
+        self.pos += 1
+        return c
+
+    def _token_complete(self, end: int) -> bool:
+        """
+        raw_decode 在 end 处结束的值是否确定完整。字符串 / 数组 / 对象以闭合符号结尾，一定完整；
+        数字与字面量（如 "1." "1e" 之后才读到 "5e10"）需要看到一个不可能延续 token 的字符才能确认。
+        """
+        if self.eof or self.buf[self.pos] in '"[{':
+            return True
+        buf = self.buf
+        while end < len(buf):
+            if buf[end] not in _TOKEN_CONT:
+                return True
+            end += 1
+        return False
 
-def read_json(path_patterns: Union[str, List[str]], ignore_errors: bool = False) -> Generator[Any, None, None]:
+    def decode_value(self) -> Any:
+        """
+        解析一个完整的 JSON 值。缓冲区不足（值被截断，或数字 / 字面量之后还没读到分隔符）时继续读取。
+        """
+        self.next_char()
+        # 单个值超过 chunk_size 时按倍数扩大读取量，避免反复从头解析
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _RAW_DECODER.raw_decode(self.buf, self.pos)
+                if self._token_complete(end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                # 错误发生在已缓冲数据的中间说明是真正的语法错误，直接抛出，不把文件剩余部分读进缓冲区；
+                # 只有错误位于末尾附近（或字符串读到缓冲区末尾仍未结束）时才可能是数据还没读够
+                if self.eof or not (e.pos >= len(self.buf) - _TRUNCATION_MARGIN
+                                    or e.msg.startswith("Unterminated string")):
+                    raise
+            self._fill(size)
+            size *= 2
+
+def _iter_json_stream(path: str, chunk_size: int) -> Generator[Any, None, None]:
+    with open_text(path) as reader:
+        stream = _JsonStreamReader(reader, chunk_size)
+        opener = stream.expect("{[")
+        if opener == "{":
+            if stream.next_char() == "}":
+                return
+            while True:
+                key = stream.decode_value()
+                if not isinstance(key, str):
+                    raise json.JSONDecodeError("object 的键必须是字符串", stream.buf, stream.pos)
+                stream.expect(":")
+                yield key, stream.decode_value()
+                if stream.expect(",}") == "}":
+                    return
+        else:
+            if stream.next_char() == "]":
+                return
+            while True:
+                yield stream.decode_value()
+                if stream.expect(",]") == "]":
+                    return
+
+def read_json(path_patterns: Union[str, List[str]], ignore_errors: bool = False,
+              stream: bool = False, chunk_size: int = 1024 * 1024) -> Generator[Any, None, None]:
     """
     读取标准 JSON 文件（注意：大文件可能导致 OOM）。
+    :param stream: True 时不构建完整文档，逐个输出顶层元素：
+                   顶层为 object 时输出 (key, value)，顶层为 array 时输出每个元素。
+                   适合 topic_id -> 结果 这类几十万条目的大字典，调用方可以边读边构建精简的查找表。
+                   已输出部分元素后才遇到解析错误时抛出 ValueError（不受 ignore_errors 影响），不会静默截断
+    :param chunk_size: 流式模式下每次读取的字符数
     """
     if isinstance(path_patterns, str):
         path_patterns = [path_patterns]
@@ -67,6 +810,19 @@ def read_json(path_patterns: Union[str, List[str]], ignore_errors: bool = False)
     for path_pattern in path_patterns:
         path_list = sorted(glob.glob(path_pattern, recursive=True))
         for path in path_list:
+            if stream:
+                count = 0
+                try:
+                    for item in _iter_json_stream(path, chunk_size):
+                        yield item
+                        count += 1
+                except json.JSONDecodeError as e:
+                    # 已经输出了部分元素时不能当作整个文件损坏跳过，否则下游拿到的是不完整的数据
+                    if count:
+                        raise ValueError(f"JSON文件流式解析失败 [{path}]：已输出 {count} 个元素后出错: {e}") from e
+                    if not ignore_errors:
+                        logger.warning(f"JSON文件流式解析失败 [{path}]: {e}")
+                continue
             with open(path, encoding="utf-8", errors="replace") as reader:
                 try:
                     yield json.load(reader)
@@ -75,9 +831,177 @@ def read_json(path_patterns: Union[str, List[str]], ignore_errors: bool = False)
                         logger.warning(f"JSON文件加载失败 [{path}]: {e}")
                     continue
 
-def save_jsonl(samples, result_save_path: str, overwrite: bool = False) -> None:
+class JsonlWriter:
     """
-    保存为 JSONL 格式。
+    带缓冲、原子提交、可自动分片的 JSONL 写入器。
+
+    - 数据先写入同目录下的隐藏临时文件，close() 时 os.replace 到最终路径；
+      中途异常（或进程崩溃）不会留下被 checkpoint_to_file 当作缓存命中的半截文件。
+    - 逐条编码后在内存中攒批，达到 buffer_size 字节才真正写入，压缩文件同样受益。
+    - 设置 shard_records / shard_bytes 后按条数或字节数（未压缩）自动切分为 part001、part002 ...：
+        path 中含 "{part}" 占位符时按其格式化，如 "xxx_part{part:03d}.json"；
+        否则在后缀前插入 "_part{NNN}"，如 "xxx.json.gz" -> "xxx_part001.json.gz"。
+    - close() 返回清单：[{"path": ..., "count": ..., "bytes": ...}, ...]
+    - path 以 .frames（.frames.gz / .frames.zst）结尾时写二进制帧格式，见 common_utils.frames。
+
+    用法：
+        with JsonlWriter("out.json", shard_records=500) as writer:
+            writer.write_many(samples)
+        manifest = writer.manifest
+    """
+
+    def __init__(self, path: str, codec: Optional[Union[str, JsonCodec]] = None,
+                 buffer_size: int = 4 * 1024 * 1024, fsync: bool = False,
+                 shard_records: Optional[int] = None, shard_bytes: Optional[int] = None,
+                 compress_level: Optional[int] = None, compress_threads: Optional[int] = None):
+        """
+        :param fsync: True 时每个分片提交前 fsync 文件、提交后 fsync 目录，保证掉电后数据落盘
+        :param shard_records: 每个分片的最大条数
+        :param shard_bytes: 每个分片的最大字节数（按未压缩的数据计）
+        """
+        self.path = str(path)
+        self.dumps = get_codec(codec).dumps
+        self._frame_encode = FrameEncoder(codec).encode if is_frames_path(self.path) else None
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.shard_records = shard_records
+        self.shard_bytes = shard_bytes
+        self.compress_level = compress_level
+        self.compress_threads = compress_threads
+        self.sharded = shard_records is not None or shard_bytes is not None
+        self.manifest: List[dict] = []
+        self.closed = False
+
+        self._compression = _compression_of(self.path)
+        self._part = 0
+        self._fh = None
+        self._tmp_path: Optional[Path] = None
+        self._final_path: Optional[Path] = None
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._count = 0
+        self._bytes = 0
+        # 非分片模式下即使没有数据也生成空文件，与原 save_jsonl 行为一致
+        if not self.sharded:
+            self._open_shard()
+
+    def _shard_path(self, part: int) -> Path:
+        if not self.sharded:
+            return Path(self.path)
+        if "{part" in self.path:
+            return Path(self.path.format(part=part))
+        p = Path(self.path)
+        suffix = p.suffix if self._compression is None else "".join(p.suffixes[-2:])
+        stem = p.name[:len(p.name) - len(suffix)] if suffix else p.name
+        return p.with_name(f"{stem}_part{part:03d}{suffix}")
+
+    def _open_shard(self) -> None:
+        self._part += 1
+        self._final_path = self._shard_path(self._part)
+        self._final_path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self._final_path.with_name(f".{self._final_path.name}.tmp-{os.getpid()}")
+        self._fh = _open_binary_writer(self._tmp_path, self._compression, self.buffer_size,
+                                       self.compress_level, self.compress_threads, fsync=self.fsync)
+        self._count = 0
+        self._bytes = 0
+        if self._frame_encode is not None:
+            self._fh.write(FRAMES_HEADER)
+            self._bytes = len(FRAMES_HEADER)
+
+    def _flush_pending(self) -> None:
+        if self._pending:
+            self._fh.write(b"".join(self._pending))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def _commit_shard(self) -> None:
+        self._flush_pending()
+        # fsync=True 时 close() 会在压缩流写完结尾后 fsync 底层文件，再 os.replace 发布
+        self._fh.close()
+        self._fh = None
+        os.replace(self._tmp_path, self._final_path)
+        if self.fsync:
+            dir_fd = os.open(self._final_path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        self.manifest.append({"path": self._final_path.as_posix(), "count": self._count, "bytes": self._bytes})
+        self._tmp_path = None
+
+    def write(self, sample: Any) -> None:
+        if self.closed:
+            raise ValueError(f"JsonlWriter 已关闭: {self.path}")
+        if self._frame_encode is None:
+            # 确保写入的是单行 JSON
+            line = (self.dumps(sample) + "\n").encode("utf-8")
+        else:
+            line = self._frame_encode(sample)
+        size = len(line)
+
+        if self.sharded and self._fh is not None and (
+                (self.shard_records is not None and self._count >= self.shard_records)
+                or (self.shard_bytes is not None and self._count > 0 and self._bytes + size > self.shard_bytes)):
+            self._commit_shard()
+        if self._fh is None:
+            self._open_shard()
+
+        self._pending.append(line)
+        self._pending_bytes += size
+        self._count += 1
+        self._bytes += size
+        if self._pending_bytes >= self.buffer_size:
+            self._flush_pending()
+
+    def write_many(self, samples: Iterable[Any]) -> int:
+        n = 0
+        for sample in samples:
+            self.write(sample)
+            n += 1
+        return n
+
+    def close(self) -> List[dict]:
+        """
+        提交最后一个分片，返回清单。
+        """
+        if not self.closed:
+            if self._fh is not None:
+                self._commit_shard()
+            self.closed = True
+        return self.manifest
+
+    def abort(self) -> None:
+        """
+        放弃当前未提交的分片，删除临时文件（已提交的分片保留）。
+        """
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+        if self._tmp_path is not None and self._tmp_path.exists():
+            self._tmp_path.unlink()
+        self._tmp_path = None
+        self.closed = True
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def save_jsonl(samples, result_save_path: str, overwrite: bool = False,
+               codec: Optional[Union[str, JsonCodec]] = None,
+               compress_level: Optional[int] = None, compress_threads: Optional[int] = None) -> None:
+    """
+    保存为 JSONL 格式。路径以 .gz / .zst 结尾时流式压缩写入。
+    通过 JsonlWriter 先写临时文件再原子替换，写入中断不会留下半截文件。
+    :param codec: JSON 编码后端，输出与 json.dumps(sample, ensure_ascii=False) 逐字节一致
+    :param compress_level: 压缩级别，见 open_text
+    :param compress_threads: zstd 压缩线程数，见 open_text
     """
     p = Path(result_save_path)
     p.parent.mkdir(parents=True, exist_ok=True)
@@ -87,29 +1011,70 @@ def save_jsonl(samples, result_save_path: str, overwrite: bool = False) -> None:
         return
     
     try:
-        count = 0
-        with open(result_save_path, "w", encoding="utf-8") as writer:
-            for sample in samples:
-                # 确保写入的是单行 JSON
-                writer.write(json.dumps(sample, ensure_ascii=False) + "\n")
-                count += 1
+        with JsonlWriter(result_save_path, codec=codec, compress_level=compress_level,
+                         compress_threads=compress_threads) as writer:
+            count = writer.write_many(samples)
         logger.info(f"已保存: {result_save_path} (共 {count} 条)")
     except Exception as e:
         logger.error(f"写入文件失败 [{result_save_path}]: {e}")
         raise
 
-def save_data_to_excel_merge(samples, file_path, key, merge=True):
+def convert_records(src_patterns: Union[str, List[str]], dst_path: str,
+                    codec: Optional[Union[str, JsonCodec]] = None,
+                    compress_level: Optional[int] = None, compress_threads: Optional[int] = None) -> int:
+    """
+    JSONL 与 frames 格式互转，格式按后缀判断（如 xxx.frames.zst -> xxx.json 用于人工查看）。
+    也可用命令行: python -m common_utils.frames src dst
+    :return: 转换的记录数
+    """
+    with JsonlWriter(dst_path, codec=codec, compress_level=compress_level,
+                     compress_threads=compress_threads) as writer:
+        count = writer.write_many(read_jsonl(src_patterns, codec=codec))
+    logger.info(f"已转换: {src_patterns} -> {dst_path} (共 {count} 条)")
+    return count
+
+# Excel 单个 sheet 的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+def _excel_value(val: Any) -> Any:
+    # 如果不是基本类型，转 JSON 字符串，防止 Excel 写入报错
+    if not isinstance(val, (str, int, float, bool, type(None))):
+        return json.dumps(val, ensure_ascii=False)
+    return val
+
+def _new_excel_sheet(wb, title: Optional[str], column_names: List[str], font_bold):
+    ws = wb.create_sheet(title=title)
+    # write_only 模式下 merged_cells 默认是 MultiCellRange，add 时会线性检查包含关系（整体 O(n^2)）；
+    # 这里只追加区域字符串，保存时 WorksheetWriter 逐个输出 <mergeCell>
+    ws.merged_cells = []
+    header = []
+    for name in column_names:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = font_bold
+        header.append(cell)
+    ws.append(header)
+    return ws
+
+def save_data_to_excel_merge(samples, file_path, key, merge=True,
+                             max_rows: int = EXCEL_MAX_ROWS, split: str = "sheet"):
     """
     生成表格，并根据 key 字段对应的列表进行单元格合并。
     修复了列名超过 Z (26列) 报错的问题。
+
+    基于 openpyxl 的 write_only 模式流式写出：samples 作为生成器逐条消费，不会整体载入内存。
+    行数超过 max_rows（Excel 上限 1048576 行，含表头）时自动拆分，同一条样本展开的行不会被拆开：
+    :param split: "sheet" 拆到同一文件的新 sheet；"file" 拆到新文件 xxx_part002.xlsx、xxx_part003.xlsx ...
     """
-    samples = list(samples)
-    if not samples:
+    if split not in ("sheet", "file"):
+        raise ValueError(f'split 必须是 "sheet" / "file"，当前是: {split!r}')
+
+    samples = iter(samples)
+    first = next(samples, None)
+    if first is None:
         logger.warning(f"没有数据需要保存到 Excel: {file_path}")
         return
     
     # 基础校验
-    first = samples[0]
     if key not in first:
         raise ValueError(f"主键 '{key}' 不在数据字段中")
     if not isinstance(first[key], list) or len(first[key]) == 0 or not isinstance(first[key][0], dict):
@@ -121,60 +1086,70 @@ def save_data_to_excel_merge(samples, file_path, key, merge=True):
     for k1 in first[key][0]:
         column_names.append(f"{key}::{k1}")
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
+    # 构建列名映射：Name -> (列序号, "A" / "B" / ... "AA")
+    col_mapping = {name: (idx, get_column_letter(idx + 1)) for idx, name in enumerate(column_names)}
+    ncol = len(column_names)
     font_bold = Font(bold=True)
-    
-    # 构建列名映射：Name -> "A", "B", ... "AA", "AB"
-    # 使用 enumerate(..., 1) 配合 get_column_letter
-    col_mapping = {}
-    for idx, name in enumerate(column_names, 1):
-        col_letter = get_column_letter(idx)
-        col_mapping[name] = col_letter
-        # 写入表头
-        cell = ws[f"{col_letter}1"]
-        cell.value = name
-        cell.font = font_bold
+    base_path = Path(file_path)
+    base_path.parent.mkdir(parents=True, exist_ok=True)
 
+    saved_paths = []
+    part = 1
+    wb = openpyxl.Workbook(write_only=True)
+    ws = _new_excel_sheet(wb, None, column_names, font_bold)
     row_start = 2  # 第一行是标题
-    for s in tqdm.tqdm(samples, desc=f"Writing to {Path(file_path).name}"):
-        nrow = len(s[key])
+    record_count = 0
+
+    def _part_path(n: int) -> Path:
+        return base_path if n == 1 else base_path.with_name(f"{base_path.stem}_part{n:03d}{base_path.suffix}")
+
+    for s in tqdm.tqdm(itertools.chain([first], samples), desc=f"Writing to {base_path.name}"):
+        inner_items = s[key]
+        nrow = max(len(inner_items), 1)
+        if nrow > max_rows - 1:
+            raise ValueError(f"单条样本展开后有 {nrow} 行，超过单个 sheet 的行数上限 {max_rows - 1}")
+
+        # 当前 sheet 放不下这一组行，换新的 sheet / 文件
+        if row_start + nrow - 1 > max_rows:
+            part += 1
+            if split == "file":
+                wb.save(_part_path(part - 1))
+                saved_paths.append(_part_path(part - 1))
+                wb = openpyxl.Workbook(write_only=True)
+                ws = _new_excel_sheet(wb, None, column_names, font_bold)
+            else:
+                ws = _new_excel_sheet(wb, f"Sheet{part}", column_names, font_bold)
+            row_start = 2
         row_end = row_start + nrow - 1
-        
-        # 1. 填入外部公共字段 (需合并)
+
+        rows = [[None] * ncol for _ in range(nrow)]
+        # 1. 填入外部公共字段 (需合并)，值写在起始行
         for k in s:
             if k == key: continue
             if k not in col_mapping: continue # 防御性编程
-            
-            col = col_mapping[k]
-            
-            # 合并单元格
+            idx, col = col_mapping[k]
+            rows[0][idx] = _excel_value(s[k])
             if merge and nrow > 1:
-                ws.merge_cells(f"{col}{row_start}:{col}{row_end}")
-            
-            val = s[k]
-            # 如果不是基本类型，转 JSON 字符串，防止 Excel 写入报错
-            if not isinstance(val, (str, int, float, bool, type(None))):
-                val = json.dumps(val, ensure_ascii=False)
-            
-            # 填入起始行
-            ws[f"{col}{row_start}"] = val
+                ws.merged_cells.append(f"{col}{row_start}:{col}{row_end}")
 
         # 2. 填入内部展开字段 (逐行填入)
-        for ii, inner_item in enumerate(s[key]):
-            current_row = row_start + ii
+        for ii, inner_item in enumerate(inner_items):
+            row = rows[ii]
             for kk, vv in inner_item.items():
-                col_name = f"{key}::{kk}"
-                if col_name in col_mapping:
-                    col = col_mapping[col_name]
-                    
-                    if not isinstance(vv, (str, int, float, bool, type(None))):
-                        vv = json.dumps(vv, ensure_ascii=False)
-                    
-                    ws[f"{col}{current_row}"] = vv
-        
+                mapped = col_mapping.get(f"{key}::{kk}")
+                if mapped is not None:
+                    row[mapped[0]] = _excel_value(vv)
+
+        for row in rows:
+            ws.append(row)
         row_start += nrow
+        record_count += 1
 
-    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-    wb.save(file_path)
-    logger.info(f"✅ Excel saved: {file_path} - Records: {len(samples)}")
\ No newline at end of file
+    final_path = _part_path(part) if split == "file" else base_path
+    wb.save(final_path)
+    saved_paths.append(final_path)
+    if len(saved_paths) > 1:
+        logger.info(f"行数超过上限，已拆分为 {len(saved_paths)} 个文件: {[p.name for p in saved_paths]}")
+    elif part > 1:
+        logger.info(f"行数超过上限，已拆分为 {part} 个 sheet")
+    logger.info(f"✅ Excel saved: {file_path} - Records: {record_count}")
@@ -181,10 +181,9 @@ def delete_fields(samples, paths: Union[str, List[str]]) -> Any:
     """
     if isinstance(paths, str):
         paths = [paths]
-    for sample in samples:
-        for p in paths:
-            delete_field_by_path(sample, p)
-        yield sample
+    # 批量路径编译成 MutationPlan，每条记录只遍历一次
+    from .manipulation import MutationPlan
+    yield from MutationPlan().delete(*paths).apply_many(samples)
 
 
 def rename_field_by_path(data: Any, path: str, new_key: str) -> None:
@@ -283,10 +282,11 @@ def rename_fields(samples, mapping: dict[str, str]):
           ".key1.key2.lst[].old": "new"
         }
     """
-    for sample in samples:
-        for path, new_key in mapping.items():
-            rename_field_by_path(sample, path, new_key)
-        yield sample
+    from .manipulation import MutationPlan
+    plan = MutationPlan()
+    for path, new_key in mapping.items():
+        plan.rename(path, new_key)
+    yield from plan.apply_many(samples)
 
 
 def _get_value_by_path_simple(item: Any, path: str) -> Any:
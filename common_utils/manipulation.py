@@ -1,5 +1,6 @@
-from typing import Any, List, Union
-from .paths import parse_path, compile_key_path, M_DICT, M_ALL, M_IND
+import copy
+from typing import Any, List, Optional, Union
+from .paths import parse_path, compile_key_path, compile_projection, compile_accessor, compile_paths, M_DICT, M_ALL, M_IND, K_DICT
 
 _MISSING = object()
 
@@ -54,10 +55,7 @@ def delete_field_by_path(data: Any, path: str) -> None:
 
 def delete_fields(samples, paths: Union[str, List[str]]) -> Any:
     if isinstance(paths, str): paths = [paths]
-    for sample in samples:
-        for p in paths:
-            delete_field_by_path(sample, p)
-        yield sample
+    yield from MutationPlan().delete(*paths).apply_many(samples)
 
 # ==================== 重命名逻辑 (保持不变) ====================
 def rename_field_by_path(data: Any, path: str, new_key: str) -> None:
@@ -102,110 +100,266 @@ def rename_field_by_path(data: Any, path: str, new_key: str) -> None:
     _rename(data, 0)
 
 def rename_fields(samples, mapping: dict[str, str]):
-    for sample in samples:
-        for path, new_key in mapping.items():
-            rename_field_by_path(sample, path, new_key)
-        yield sample
+    plan = MutationPlan()
+    for path, new_key in mapping.items():
+        plan.rename(path, new_key)
+    yield from plan.apply_many(samples)
+
+# ==================== 批量变更计划 ====================
+
+OP_DELETE = 0
+OP_RENAME = 1
+OP_SET = 2
+
+class _PlanNode:
+    """
+    变更前缀树节点。children: [(mode, key, idxs, 子节点, 路径)]，ops: 在本节点 dict 上执行的末级操作（按声明顺序）。
+    creates=True 表示子树里有 set 操作，缺失的中间 dict 需要补建。
+    """
+    __slots__ = ("children", "ops", "creates", "_index")
+
+    def __init__(self):
+        self.children = []
+        self.ops = []
+        self.creates = False
+        self._index = {}
+
+    def child(self, step: tuple, path: str) -> "_PlanNode":
+        node = self._index.get(step)
+        if node is None:
+            node = self._index[step] = _PlanNode()
+            self.children.append((*step, node, path))
+        return node
+
+def _ops_conflict(a: tuple, b: tuple) -> bool:
+    """
+    判断先声明的操作 a 与后声明的 b 能否放进同一次遍历。
+    一次遍历的执行顺序是"先处理子节点，再按声明顺序执行本节点的末级操作"，
+    只有当 a 改动的字段（包括重命名后的新名字）是 b 路径的前缀，或两者经过不同的 [] / [idx] 分支到达同一字段时，
+    结果才可能与逐条执行不同，此时 b 需要放到下一轮遍历。
+    """
+    _, a_steps, a_keys, _ = a
+    _, b_steps, b_keys, _ = b
+    for ka in a_keys:
+        for kb in b_keys:
+            m = min(len(ka), len(kb))
+            if ka[:m] != kb[:m]:
+                continue
+            if len(ka) < len(kb) or a_steps[:m - 1] != b_steps[:m - 1]:
+                return True
+    return False
+
+class MutationPlan:
+    """
+    把一批删除 / 重命名 / 赋值操作编译成前缀树，对每条记录只做一次迭代遍历（不递归）即可全部执行完，
+    结果与按声明顺序逐条调用 delete_field_by_path / rename_field_by_path 一致。
+    后面的操作依赖前面操作的结果时（例如先把 .a 重命名为 .b 再删除 .b.c），自动拆成多轮遍历以保证语义。
+
+    用法：
+        plan = MutationPlan().delete(".a.tmp", ".b[].x").rename(".a.old", "new").set(".meta.version", 2)
+        samples = plan.apply_many(samples)
+
+    路径规则与 delete_field_by_path 相同：穿过 list 必须显式写 [] 或 [idx]，否则报错。
+    set 的路径最后一段必须是普通字段名，缺失的中间 dict 会自动创建；dict / list 类型的值每条记录各自深拷贝一份。
+    """
+
+    def __init__(self):
+        self._ops: List[tuple] = []
+        self._stages: Optional[List[_PlanNode]] = None
+
+    def _add(self, kind: int, path: str, arg: Any) -> None:
+        steps = compile_key_path(path)
+        keys = [tuple(k for (_, k, __) in steps)]
+        if kind == OP_RENAME:
+            keys.append(keys[0][:-1] + (arg,))
+        self._ops.append((kind, steps, keys, (path, arg)))
+        self._stages = None
+
+    def delete(self, *paths: str) -> "MutationPlan":
+        """
+        删除字段；最后一段为 key[] 时清空列表，为 key[0,-1] 时删除对应下标的元素。
+        """
+        for path in paths:
+            if compile_key_path(path):
+                self._add(OP_DELETE, path, None)
+        return self
+
+    def rename(self, path: str, new_key: str) -> "MutationPlan":
+        """
+        把路径末级字段名改为 new_key。
+        """
+        steps = compile_key_path(path)
+        if not steps:
+            return self
+        if steps[-1][0] != M_DICT:
+            raise ValueError(f"重命名路径最后一段必须是普通字段名: {path!r}")
+        if new_key != steps[-1][1]:
+            self._add(OP_RENAME, path, new_key)
+        return self
+
+    def set(self, path: str, value: Any) -> "MutationPlan":
+        """
+        把路径末级字段赋值为 value。
+        """
+        steps = compile_key_path(path)
+        if not steps or steps[-1][0] != M_DICT:
+            raise ValueError(f"赋值路径最后一段必须是普通字段名: {path!r}")
+        self._add(OP_SET, path, value)
+        return self
+
+    def _compile(self) -> List[_PlanNode]:
+        # 按声明顺序切分成若干轮，每一轮内的操作互不冲突
+        stages: List[List[tuple]] = []
+        for op in self._ops:
+            if not stages or any(_ops_conflict(prev, op) for prev in stages[-1]):
+                stages.append([])
+            stages[-1].append(op)
+
+        roots = []
+        for stage_ops in stages:
+            root = _PlanNode()
+            for kind, steps, _, (path, arg) in stage_ops:
+                node = root
+                lineage = [node]
+                for step in steps[:-1]:
+                    node = node.child(step, path)
+                    lineage.append(node)
+                if kind == OP_SET:
+                    for n in lineage:
+                        n.creates = True
+                mode, key, idxs = steps[-1]
+                node.ops.append((kind, mode, key, idxs, arg))
+            roots.append(root)
+        return roots
+
+    def apply(self, item: Any) -> Any:
+        """
+        对单条记录原地执行全部操作，返回该记录。
+        """
+        if self._stages is None:
+            self._stages = self._compile()
+        for root in self._stages:
+            stack = [(item, root, False)]
+            pop, push = stack.pop, stack.append
+            while stack:
+                cur, node, post = pop()
+                if post:
+                    _apply_node_ops(cur, node.ops)
+                    continue
+                if not isinstance(cur, dict):
+                    continue
+                if node.ops:
+                    # 子节点全部处理完之后再执行本节点的末级操作
+                    push((cur, node, True))
+                for mode, key, idxs, child, path in node.children:
+                    nxt = cur.get(key, _MISSING)
+                    if mode == M_DICT:
+                        if nxt is _MISSING:
+                            if not child.creates:
+                                continue
+                            nxt = cur[key] = {}
+                        elif isinstance(nxt, list):
+                            raise ValueError(f"路径 {path!r} 在 '.{key}' 处遇到 list，需显式写 [] 或 [idx]。")
+                        elif not isinstance(nxt, dict):
+                            continue
+                        push((nxt, child, False))
+                    elif isinstance(nxt, list):
+                        if mode == M_ALL:
+                            for elem in nxt:
+                                push((elem, child, False))
+                        else:  # M_IND
+                            for j in _real_indices(len(nxt), idxs):
+                                push((nxt[j], child, False))
+        return item
+
+    def apply_many(self, samples) -> Any:
+        for sample in samples:
+            yield self.apply(sample)
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+def _real_indices(n: int, idxs: tuple) -> set:
+    return {j for j in ((r if r >= 0 else n + r) for r in idxs) if 0 <= j < n}
+
+def _apply_node_ops(cur: dict, ops: list) -> None:
+    for kind, mode, key, idxs, arg in ops:
+        if kind == OP_SET:
+            cur[key] = copy.deepcopy(arg) if isinstance(arg, (dict, list)) else arg
+            continue
+        if key not in cur:
+            continue
+        if kind == OP_RENAME:
+            cur[arg] = cur.pop(key)
+        elif mode == M_DICT:
+            del cur[key]
+        else:
+            lst = cur[key]
+            if not isinstance(lst, list):
+                continue
+            if mode == M_ALL:
+                cur[key] = []
+            else:  # M_IND
+                for j in sorted(_real_indices(len(lst), idxs), reverse=True):
+                    del lst[j]
 
 # ==================== 查询/获取逻辑 (更新) ====================
 
 # [已删除] get_value_by_path_simple
 
 def get_values_by_key_path(item: Any, key_path: str) -> List[Any]:
-    steps = compile_key_path(key_path)
-    if not steps: return [item]
-
-    # Fast-path for simple dict access
-    if all(m == M_DICT for (m, _, __) in steps):
-        cur = item
-        try:
-            for (_, k, __) in steps:
-                cur = cur[k]
-        except (TypeError, KeyError):
-            return []
-        return [cur]
-
-    out: List[Any] = []
-    stack: List[tuple] = [(item, 0)]
-    nsteps = len(steps)
-
-    while stack:
-        node, i = stack.pop()
-        if i == nsteps:
-            out.append(node)
-            continue
+    """
+    返回 key_path 命中的所有值。循环内反复调用同一路径时，可以先用 compile_accessor 编译再调用其方法。
+    """
+    return compile_accessor(key_path).get_all(item)
 
-        mode, key, idxs = steps[i]
-        next_i = i + 1
-        is_last = (next_i == nsteps)
-
-        if mode == M_DICT:
-            if isinstance(node, dict):
-                nxt = node.get(key, _MISSING)
-                if nxt is not _MISSING:
-                    stack.append((nxt, next_i))
-        elif mode == M_ALL:
-            if isinstance(node, dict):
-                lst = node.get(key, _MISSING)
-                if isinstance(lst, list):
-                    if is_last:
-                        out.extend(lst)
-                    else:
-                        for elem in reversed(lst):
-                            stack.append((elem, next_i))
-        else: # M_IND
-            if isinstance(node, dict):
-                lst = node.get(key, _MISSING)
-                if isinstance(lst, list) and idxs:
-                    n = len(lst)
-                    picked = []
-                    for raw in idxs:
-                        j = raw if raw >= 0 else n + raw
-                        if 0 <= j < n:
-                            picked.append(lst[j])
-                    if is_last:
-                        out.extend(picked)
-                    else:
-                        for elem in reversed(picked):
-                            stack.append((elem, next_i))
-    return out
+def extract_paths(item: Any, key_paths: List[str]) -> List[List[Any]]:
+    """
+    一次遍历取出多条路径的值，结果与 [get_values_by_key_path(item, p) for p in key_paths] 一致。
+    key_paths 合并成前缀树后缓存，公共前缀只走一遍。
+    """
+    return compile_paths(tuple(key_paths)).get_all(item)
 
 def has_key_path(item: Any, key_path: str) -> bool:
-    # 逻辑保持不变...
-    steps = parse_path(key_path)
-    if not steps: return True
+    """
+    判断路径是否存在：[] 要求列表非空且每个元素都满足后续路径，[idx] 要求所有下标都在范围内。
+    使用编译后的显式栈实现，任一分支失败立即返回。
+    """
+    return compile_accessor(key_path).exists(item)
 
-    def _exists(cur: Any, idx: int) -> bool:
-        if idx >= len(steps): return True
-        step = steps[idx]
-        is_last = (idx == len(steps) - 1)
+def get_if_exists(item: Any, key_path: str, default: Any = None) -> Any:
+    """
+    has_key_path 为真时返回 get_values_by_key_path 的结果，否则返回 default，只遍历记录一次。
+    """
+    vals = compile_accessor(key_path).get_if_exists(item)
+    return default if vals is None else vals
 
-        if step.mode == "dict":
-            if not isinstance(cur, dict) or step.key not in cur: return False
-            return _exists(cur[step.key], idx + 1)
-        
-        elif step.mode == "all":
-            if not isinstance(cur, dict) or step.key not in cur: return False
-            lst = cur[step.key]
-            if not isinstance(lst, list): return False
-            if is_last: return len(lst) > 0
-            if not lst: return False
-            return all(_exists(elem, idx + 1) for elem in lst)
-            
-        elif step.mode == "indices":
-            if not isinstance(cur, dict) or step.key not in cur: return False
-            lst = cur[step.key]
-            if not isinstance(lst, list): return False
-            raw = step.indices or []
-            if not raw: return False
-            n = len(lst)
-            elems = []
-            for r in raw:
-                j = r if r >= 0 else n + r
-                if 0 <= j < n: elems.append(lst[j])
-                else: return False
-            if is_last: return len(elems) > 0
-            return all(_exists(e, idx + 1) for e in elems)
-        return False
-
-    return _exists(item, 0)
\ No newline at end of file
+# ==================== 字段投影 ====================
+
+def _project(obj: dict, children: dict) -> dict:
+    out = {}
+    for key, node in children.items():
+        val = obj.get(key, _MISSING)
+        if val is _MISSING:
+            continue
+        if node.leaf or val is None:
+            out[key] = val
+        elif node.kind == K_DICT:
+            if isinstance(val, dict):
+                out[key] = _project(val, node.children)
+        elif isinstance(val, list):
+            # 列表整体保留（非 dict 元素占位为 None），保证 [idx] 下标与原记录一致
+            out[key] = [_project(e, node.children) if isinstance(e, dict) else None for e in val]
+    return out
+
+def project_fields(item: Any, fields: Union[str, List[str]]) -> Any:
+    """
+    只保留 fields 中各路径对应的字段，返回精简后的新记录（不修改原记录）。
+    对每条 path 都有 get_values_by_key_path(精简记录, path) == get_values_by_key_path(原记录, path)。
+    """
+    if isinstance(fields, str):
+        fields = [fields]
+    tree = compile_projection(tuple(fields))
+    if tree is None or not isinstance(item, dict):
+        return item
+    return _project(item, tree)
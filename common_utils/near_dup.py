@@ -0,0 +1,157 @@
+"""
+近似重复检测：题干文本规范化 + MinHash 签名 + LSH 分段索引。
+
+只差空白、&nbsp;、标点或全角 / 半角数字的题目，精确键去重识别不出来，
+这里先把文本规范化，再按字符 n-gram 计算 MinHash 签名，
+用 LSH 分段（band）索引找出候选，最后按签名估计的 Jaccard 相似度确认。
+依赖 numpy（可选依赖，未安装时构造 MinHashLSH 会报错）。
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None
+
+# ==================== 文本规范化 ====================
+
+# 与 预置问题拒识代码/manager.py 中 question_preprocess 相同的清洗规则
+_PREPROCESS_SUBS = (
+    (re.compile(r"(?:&nbsp;)+"), " "),
+    (re.compile(r"<question_number>(.+?)</question_number>", re.S), r"\1"),
+    (re.compile(r"<underline>(.+?)</underline>", re.S), r"\1"),
+    (re.compile(r"<answerarea></answerarea>"), "()"),
+    (re.compile(r"<answerarea>(.+?)</answerarea>"), r"\1"),
+)
+# 与 视频生产步骤/3.filter_matched_only.py 中 norm 相同：去掉空白和中英文标点
+_NORM_RE = re.compile(r"[\s，。、《》“”\"',.?!！？；;：:、·\t\r\n]+")
+
+def normalize_question_text(text: str) -> str:
+    """
+    题干文本规范化：question_preprocess 的标签清洗 + NFKC（全角数字 / 字母转半角）+ 小写 + norm 去空白和标点。
+    """
+    text = text.replace("\\enter", "")
+    for pattern, repl in _PREPROCESS_SUBS:
+        text = pattern.sub(repl, text)
+    text = text.replace("ifly-latex-begin", "$").replace("ifly-latex-end", "$").replace("<img />", "")
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _NORM_RE.sub("", text)
+
+# ==================== MinHash + LSH ====================
+
+# FNV-1 64 位素数
+_ROLL_PRIME = np.uint64(1099511628211) if np is not None else None
+
+_FP_WEIGHT = 0.1
+_FN_WEIGHT = 0.9
+
+@lru_cache(maxsize=64)
+def _optimal_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    选择 bands * rows <= num_perm 的分段方式，使误报面积（相似度 < threshold 却成为候选）
+    与漏报面积（相似度 >= threshold 却不是候选）的加权和最小。
+    候选概率 P(s) = 1 - (1 - s^rows)^bands。候选之后还会按完整签名确认，误报只多一次比较，
+    因此漏报的权重取 0.9（threshold=0.8 时 bands x rows = 14 x 9，相似度恰为 0.8 的对约 87% 能被找出）。
+    """
+    s_lo = np.linspace(0.0, threshold, 64)
+    s_hi = np.linspace(threshold, 1.0, 64)
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            fp = (1 - (1 - s_lo ** rows) ** bands).mean() * threshold
+            fn = ((1 - s_hi ** rows) ** bands).mean() * (1 - threshold)
+            cost = _FP_WEIGHT * fp + _FN_WEIGHT * fn
+            if best is None or cost < best[0]:
+                best = (cost, bands, rows)
+    return best[1], best[2]
+
+class MinHashLSH:
+    """
+    字符 n-gram MinHash 签名 + LSH 分段索引。
+      - signature(text)：文本（应已规范化）-> uint32 签名，长度 num_perm
+      - query(sig)：返回已插入的、估计 Jaccard 相似度 >= threshold 的键
+      - insert(key, sig)：加入索引
+    n-gram 先用多项式滚动哈希映射为 64 位整数，再用 num_perm 个 multiply-shift 哈希函数
+    （h(x) = (a * x + b) mod 2^64 >> 32，a 为奇数）整体矩阵化计算最小值，不逐个 n-gram 循环。
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, ngram: int = 3, seed: int = 1):
+        if np is None:
+            raise ImportError("近似去重依赖 numpy，请先安装: pip install numpy")
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold 必须在 (0, 1] 之间: {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self.bands, self.rows = _optimal_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+        self._tables: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._keys: List[Hashable] = []
+        self._sigs: List[Any] = []
+
+    def _shingles(self, text: str):
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        k = self.ngram
+        if len(codes) < k:
+            k = len(codes)
+        n = len(codes) - k + 1
+        # 多项式滚动哈希，按位置整体向量化，溢出即 mod 2^64
+        acc = codes[:n].copy()
+        with np.errstate(over="ignore"):
+            for j in range(1, k):
+                acc = acc * _ROLL_PRIME + codes[j:j + n]
+        return np.unique(acc)
+
+    def signature(self, text: str):
+        """
+        返回 uint32 签名；空文本返回 None（不参与近似去重）。
+        """
+        if not text:
+            return None
+        shingles = self._shingles(text)
+        with np.errstate(over="ignore"):
+            hashed = (self._a * shingles[np.newaxis, :] + self._b) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig) -> List[bytes]:
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def query(self, sig) -> List[Hashable]:
+        candidates = set()
+        for table, band in zip(self._tables, self._band_keys(sig)):
+            ids = table.get(band)
+            if ids:
+                candidates.update(ids)
+        result = []
+        for i in candidates:
+            if np.count_nonzero(self._sigs[i] == sig) >= self.threshold * self.num_perm:
+                result.append(self._keys[i])
+        return result
+
+    def insert(self, key: Hashable, sig) -> None:
+        idx = len(self._keys)
+        self._keys.append(key)
+        self._sigs.append(sig)
+        for table, band in zip(self._tables, self._band_keys(sig)):
+            table.setdefault(band, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return (f"<MinHashLSH items={len(self)} threshold={self.threshold} num_perm={self.num_perm} "
+                f"bands={self.bands}x{self.rows}>")
+
+def estimate_jaccard(sig_a, sig_b) -> float:
+    """
+    两个签名估计的 Jaccard 相似度。
+    """
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
@@ -0,0 +1,238 @@
+"""
+生成器管道的并发 map。
+
+  - parallel_map：管道各层多是逐条的 CPU 密集处理（正则清洗、json_repair、字符串模板），把记录分块交给进程池。
+  - async_map：  逐条请求 HTTP 服务（latex2html、爬取平台接口）这类 I/O 密集处理，在后台线程的 asyncio 事件循环里
+                 限流并发执行，带重试退避与单次超时。
+两者对下游都是按输入顺序交出结果的普通生成器，可以直接放进 checkpoint_to_file 的 stage 或交给 run_pipeline。
+"""
+import asyncio
+import itertools
+import logging
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Generator, Iterable, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+def _map_chunk(fn: Callable, chunk: List[Any], batched: bool) -> List[Any]:
+    """
+    子进程任务：处理一个分块，返回结果列表。
+    """
+    if batched:
+        return list(fn(chunk))
+    return [fn(sample) for sample in chunk]
+
+
+def parallel_map(fn: Callable, samples: Iterable[Any], workers: Optional[int] = None, chunksize: int = 256,
+                 ordered: bool = True, batched: bool = False,
+                 max_in_flight: Optional[int] = None) -> Generator[Any, None, None]:
+    """
+    多进程 map：按 chunksize 分块提交到进程池，逐条交出结果。
+    :param fn: 逐条处理函数 fn(sample) -> result；batched=True 时为生成器函数 fn(samples) -> 可迭代结果，
+               管道里现有的 filter_xxx(samples, ...) / to_xxx(samples, ...) 用 functools.partial 绑定其余参数即可直接使用，
+               可以过滤（不产出）或一条变多条，但状态只在分块内有效（不能跨块去重、计数）。
+               fn 需要能被 pickle：模块级函数或 functools.partial，不能是 lambda / 闭包
+    :param workers: 进程数，None 为 CPU 数；<= 1 时在当前进程内直接执行（batched 时即 fn(samples)），便于调试
+    :param chunksize: 每个任务的记录数。单条处理越快，分块应越大，以摊薄进程间传输的开销
+    :param ordered: True 时输出顺序与输入一致；False 时按分块完成顺序输出
+    :param max_in_flight: 同时在途（已读入、未交给下游）的记录数上限，默认 workers * 2 个分块，用于限制内存
+    """
+    if chunksize < 1:
+        raise ValueError(f"chunksize 必须 >= 1: {chunksize}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        if batched:
+            yield from fn(samples)
+        else:
+            for sample in samples:
+                yield fn(sample)
+        return
+
+    max_chunks = workers * 2 if max_in_flight is None else max(1, max_in_flight // chunksize)
+    it = iter(samples)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        def _submit_next():
+            chunk = list(itertools.islice(it, chunksize))
+            if not chunk:
+                return None
+            return executor.submit(_map_chunk, fn, chunk, batched)
+
+        if ordered:
+            # 按提交顺序取结果
+            pending = deque()
+            for _ in range(max_chunks):
+                future = _submit_next()
+                if future is None:
+                    break
+                pending.append(future)
+            while pending:
+                results = pending.popleft().result()
+                future = _submit_next()
+                if future is not None:
+                    pending.append(future)
+                yield from results
+        else:
+            # 谁先完成先输出谁
+            pending = set()
+            for _ in range(max_chunks):
+                future = _submit_next()
+                if future is None:
+                    break
+                pending.add(future)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    nxt = _submit_next()
+                    if nxt is not None:
+                        pending.add(nxt)
+                    yield from future.result()
+    finally:
+        # 下游提前停止或出错时不再等待排队中的分块
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ==================== async_map ====================
+
+class _LoopThread:
+    """
+    在后台线程中运行的事件循环，管道所在的主线程通过 run_coroutine_threadsafe 提交任务。
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="async_map-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        async def _cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.submit(_cancel_all()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class _Raised:
+    """
+    fn 抛出的 KeyboardInterrupt / SystemExit：在事件循环里重新抛出会让循环线程直接退出，包一层带回主线程再抛出。
+    """
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _backoff_delay(attempt: int, backoff: float, max_backoff: float) -> float:
+    # 指数退避 + 抖动，避免大量失败请求同时重试
+    return min(max_backoff, backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def async_map(fn: Callable, samples: Iterable[Any], concurrency: int = 16, timeout: Optional[float] = None,
+              retries: int = 0, backoff: float = 0.5, max_backoff: float = 30.0,
+              retry_on: Tuple[Type[BaseException], ...] = (Exception,), on_error: str = "raise",
+              max_in_flight: Optional[int] = None) -> Generator[Any, None, None]:
+    """
+    I/O 密集的并发 map：最多 concurrency 个请求同时进行，结果按输入顺序交出。
+    :param fn: async def fn(sample) -> result；也可以是普通函数（如基于 requests 的调用），
+               此时在 concurrency 个线程中执行，超时只会停止等待，已发出的请求不会被中断
+    :param concurrency: 同时进行的调用数
+    :param timeout: 单次调用的超时秒数，超时按失败处理（可重试）
+    :param retries: 失败后的重试次数（不含第一次调用）
+    :param backoff / max_backoff: 第 k 次重试前等待 min(max_backoff, backoff * 2^k) 秒，再乘以 0.5~1 的随机抖动
+    :param retry_on: 只有这些异常会重试，其余异常直接按失败处理
+    :param on_error: 重试用尽仍失败时："raise" 在该记录的位置把异常抛给下游；"skip" 打印 Warning 并跳过该记录
+    :param max_in_flight: 已读入、未交给下游的记录数上限，默认 concurrency * 4，用于限制内存
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency 必须 >= 1: {concurrency}")
+    if on_error not in ("raise", "skip"):
+        raise ValueError(f'on_error 必须是 "raise" / "skip"，当前是: {on_error!r}')
+    max_in_flight = concurrency * 4 if max_in_flight is None else max(1, max_in_flight)
+    is_async = asyncio.iscoroutinefunction(fn)
+
+    runner = _LoopThread()
+    pool = None if is_async else ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="async_map")
+
+    async def _make_semaphore():
+        return asyncio.Semaphore(concurrency)
+    semaphore = runner.submit(_make_semaphore()).result()
+
+    async def _call(sample):
+        try:
+            return await _attempts(sample)
+        except (KeyboardInterrupt, SystemExit) as e:
+            return _Raised(e)
+
+    async def _attempts(sample):
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    if is_async:
+                        awaitable = fn(sample)
+                    else:
+                        awaitable = asyncio.get_running_loop().run_in_executor(pool, fn, sample)
+                    if timeout is not None:
+                        return await asyncio.wait_for(awaitable, timeout)
+                    return await awaitable
+                except retry_on as e:
+                    if attempt >= retries:
+                        raise
+                    error = e
+            # 退避期间释放并发名额
+            delay = _backoff_delay(attempt, backoff, max_backoff)
+            attempt += 1
+            logger.debug(f"async_map 第 {attempt} 次重试（{delay:.2f}s 后）: {type(error).__name__}: {error}")
+            await asyncio.sleep(delay)
+
+    pending = deque()
+
+    def _take():
+        future = pending.popleft()
+        try:
+            result = future.result()
+        except Exception as e:
+            if on_error == "raise":
+                raise
+            logger.warning(f"async_map 调用失败，已跳过该记录: {type(e).__name__}: {e}")
+            return False, None
+        if isinstance(result, _Raised):
+            raise result.error
+        return True, result
+
+    try:
+        for sample in samples:
+            pending.append(runner.submit(_call(sample)))
+            if len(pending) >= max_in_flight:
+                ok, result = _take()
+                if ok:
+                    yield result
+        while pending:
+            ok, result = _take()
+            if ok:
+                yield result
+    finally:
+        # 下游提前停止或出错时取消未完成的调用
+        for future in pending:
+            future.cancel()
+        runner.stop()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
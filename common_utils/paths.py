@@ -73,4 +73,368 @@ def compile_key_path(path: str) -> Tuple[Tuple[int, str, Optional[Tuple[int, ...
             compiled.append((M_IND, s.key, tuple(s.indices or ())))
         else:
             raise ValueError(f"unknown mode: {s.mode}")
-    return tuple(compiled)
\ No newline at end of file
+    return tuple(compiled)
+
+# ==================== 字段投影 (只保留指定路径) ====================
+
+# 投影树节点的容器类型
+K_DICT = "dict"
+K_LIST = "list"
+
+@dataclass
+class ProjectionNode:
+    """
+    投影树节点。leaf=True 表示需要完整保留该字段的值；
+    否则按 kind 继续向下投影：dict 对应 .key，list 对应 .key[] / .key[idx]（列表整体保留，元素再投影，保证下标不变）。
+    """
+    leaf: bool = False
+    kind: Optional[str] = None
+    children: "typing.Dict[str, ProjectionNode]" = None
+
+@lru_cache(maxsize=256)
+def compile_projection(fields: Tuple[str, ...]) -> Optional[typing.Dict[str, ProjectionNode]]:
+    """
+    把多条路径合并成一棵投影树（根节点的 children）。
+    同一个字段既被当作 dict 又被当作 list 访问时，退化为完整保留。
+    路径中包含空路径（整条记录）时返回 None，表示不做投影。
+    """
+    root: typing.Dict[str, ProjectionNode] = {}
+    for field in fields:
+        steps = compile_key_path(field)
+        if not steps:
+            # 空路径表示整条记录
+            return None
+        children = root
+        for i, (mode, key, _) in enumerate(steps):
+            node = children.get(key)
+            if node is None:
+                node = children[key] = ProjectionNode(children={})
+            if node.leaf:
+                break
+            kind = K_DICT if mode == M_DICT else K_LIST
+            if i == len(steps) - 1 or (node.kind is not None and node.kind != kind):
+                node.leaf, node.kind, node.children = True, None, {}
+                break
+            node.kind = kind
+            children = node.children
+    return root
+
+# ==================== 编译后的路径访问器 ====================
+
+_MISSING = object()
+
+def _iter_path_values(item: typing.Any, steps: tuple) -> typing.Iterator[typing.Any]:
+    """
+    显式栈按文档顺序惰性产出路径对应的值，与 get_values_by_key_path 的结果顺序一致。
+    """
+    nsteps = len(steps)
+    stack = [(item, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node, i = pop()
+        if i == nsteps:
+            yield node
+            continue
+        if not isinstance(node, dict):
+            continue
+        mode, key, idxs = steps[i]
+        nxt = node.get(key, _MISSING)
+        if nxt is _MISSING:
+            continue
+        next_i = i + 1
+        if mode == M_DICT:
+            push((nxt, next_i))
+            continue
+        if not isinstance(nxt, list):
+            continue
+        if mode == M_ALL:
+            picked = nxt
+        else:  # M_IND
+            n = len(nxt)
+            picked = [nxt[j] for j in ((r if r >= 0 else n + r) for r in idxs) if 0 <= j < n]
+        if next_i == nsteps:
+            yield from picked
+        else:
+            for elem in reversed(picked):
+                push((elem, next_i))
+
+def _path_exists(item: typing.Any, steps: tuple) -> bool:
+    """
+    has_key_path 的判定规则：[] 要求列表非空且每个元素都满足后续路径，
+    [idx] 要求所有下标都在范围内且对应元素都满足后续路径。任一分支失败立即返回。
+    """
+    nsteps = len(steps)
+    stack = [(item, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node, i = pop()
+        if i == nsteps:
+            continue
+        if not isinstance(node, dict):
+            return False
+        mode, key, idxs = steps[i]
+        nxt = node.get(key, _MISSING)
+        if nxt is _MISSING:
+            return False
+        next_i = i + 1
+        if mode == M_DICT:
+            push((nxt, next_i))
+            continue
+        if not isinstance(nxt, list) or not nxt:
+            return False
+        if mode == M_ALL:
+            picked = nxt
+        else:  # M_IND
+            if not idxs:
+                return False
+            n = len(nxt)
+            picked = []
+            for r in idxs:
+                j = r if r >= 0 else n + r
+                if not 0 <= j < n:
+                    return False
+                picked.append(nxt[j])
+        if next_i < nsteps:
+            for elem in picked:
+                push((elem, next_i))
+    return True
+
+def _path_values_if_exists(item: typing.Any, steps: tuple) -> typing.Optional[List[typing.Any]]:
+    """
+    一次遍历同时完成 _path_exists 的判定与取值：路径存在时返回按文档顺序的值列表，否则返回 None。
+    """
+    nsteps = len(steps)
+    out = []
+    stack = [(item, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node, i = pop()
+        if i == nsteps:
+            out.append(node)
+            continue
+        if not isinstance(node, dict):
+            return None
+        mode, key, idxs = steps[i]
+        nxt = node.get(key, _MISSING)
+        if nxt is _MISSING:
+            return None
+        next_i = i + 1
+        if mode == M_DICT:
+            push((nxt, next_i))
+            continue
+        if not isinstance(nxt, list) or not nxt:
+            return None
+        if mode == M_ALL:
+            picked = nxt
+        else:  # M_IND
+            if not idxs:
+                return None
+            n = len(nxt)
+            picked = []
+            for r in idxs:
+                j = r if r >= 0 else n + r
+                if not 0 <= j < n:
+                    return None
+                picked.append(nxt[j])
+        if next_i == nsteps:
+            out.extend(picked)
+        else:
+            for elem in reversed(picked):
+                push((elem, next_i))
+    return out
+
+class KeyPath:
+    """
+    编译后的键路径访问器，按路径形态生成专用的查找函数，适合在循环外编译一次、循环内反复调用：
+      - get_all(item)                  所有命中的值（列表），等价于 get_values_by_key_path
+      - get_first(item, default=None)  第一个命中的值，没有则返回 default
+      - iter_values(item)              惰性产出命中的值
+      - exists(item)                   等价于 has_key_path
+      - get_if_exists(item)            exists 为真时返回 get_all 的结果，否则返回 None，只遍历一次
+    纯 .a.b.c 路径直接展开成连续的下标访问，不分配中间列表。实例本身可调用，等价于 get_all。
+    """
+    __slots__ = ("path", "steps", "get_all", "get_first", "iter_values", "exists", "get_if_exists")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.steps = steps = compile_key_path(path)
+        if not steps:
+            self.get_all = lambda item: [item]
+            self.get_first = lambda item, default=None: item
+            self.iter_values = lambda item: iter((item,))
+            self.exists = lambda item: True
+            self.get_if_exists = lambda item: [item]
+        elif all(m == M_DICT for (m, _, __) in steps):
+            self._compile_dict_path(tuple(k for (_, k, __) in steps))
+        else:
+            self.get_all = lambda item: list(_iter_path_values(item, steps))
+            self.get_first = lambda item, default=None: next(_iter_path_values(item, steps), default)
+            self.iter_values = lambda item: _iter_path_values(item, steps)
+            self.exists = lambda item: _path_exists(item, steps)
+            self.get_if_exists = lambda item: _path_values_if_exists(item, steps)
+
+    def _compile_dict_path(self, keys: Tuple[str, ...]) -> None:
+        # 键都是字符串，对 list / str 取下标会抛 TypeError，与 isinstance(dict) 判断等价
+        if len(keys) == 1:
+            k0, = keys
+
+            def get_first(item, default=None):
+                try:
+                    return item[k0]
+                except (TypeError, KeyError):
+                    return default
+        elif len(keys) == 2:
+            k0, k1 = keys
+
+            def get_first(item, default=None):
+                try:
+                    return item[k0][k1]
+                except (TypeError, KeyError):
+                    return default
+        else:
+            def get_first(item, default=None):
+                try:
+                    for k in keys:
+                        item = item[k]
+                except (TypeError, KeyError):
+                    return default
+                return item
+
+        def get_all(item):
+            val = get_first(item, _MISSING)
+            return [] if val is _MISSING else [val]
+
+        def iter_values(item):
+            val = get_first(item, _MISSING)
+            return iter(()) if val is _MISSING else iter((val,))
+
+        def exists(item):
+            return get_first(item, _MISSING) is not _MISSING
+
+        def get_if_exists(item):
+            val = get_first(item, _MISSING)
+            return None if val is _MISSING else [val]
+
+        self.get_first, self.get_all, self.iter_values = get_first, get_all, iter_values
+        self.exists, self.get_if_exists = exists, get_if_exists
+
+    def __call__(self, item: typing.Any) -> List[typing.Any]:
+        return self.get_all(item)
+
+    def __repr__(self) -> str:
+        return f"KeyPath({self.path!r})"
+
+@lru_cache(maxsize=1024)
+def compile_accessor(path: str) -> KeyPath:
+    """
+    将路径编译为 KeyPath 访问器（带缓存，同一路径返回同一个对象）。
+    """
+    return KeyPath(path)
+
+# ==================== 多路径一次遍历 (前缀树) ====================
+
+def _build_path_trie(steps_list: typing.Sequence[tuple]) -> dict:
+    """
+    把多条编译后的路径合并成前缀树。节点为 {"targets": [...], "children": {step: 子节点}}，
+    targets 是在该节点结束的路径序号。
+    """
+    root = {"targets": [], "children": {}}
+    for t, steps in enumerate(steps_list):
+        node = root
+        for step in steps:
+            node = node["children"].setdefault(step, {"targets": [], "children": {}})
+        node["targets"].append(t)
+    return root
+
+def _compile_trie_node(node: dict) -> typing.Callable[[typing.Any, list], None]:
+    """
+    前缀树节点 -> 访问函数 visit(value, out)，把命中的值追加到 out[路径序号]。
+    只有一条路径在此结束、且没有更深路径的 .key 子节点单独拿出来直接 get，省掉一层函数调用。
+    子节点按文档顺序递归，路径深度有限，不会递归过深。
+    """
+    targets = tuple(node["targets"])
+    leaf_keys = []
+    inner = []
+    for (mode, key, idxs), child in node["children"].items():
+        if mode == M_DICT and len(child["targets"]) == 1 and not child["children"]:
+            leaf_keys.append((key, child["targets"][0]))
+        else:
+            inner.append((mode, key, idxs, _compile_trie_node(child)))
+    leaf_keys = tuple(leaf_keys)
+    inner = tuple(inner)
+
+    def visit(value, out):
+        for t in targets:
+            out[t].append(value)
+        if not isinstance(value, dict):
+            return
+        get = value.get
+        for key, t in leaf_keys:
+            nxt = get(key, _MISSING)
+            if nxt is not _MISSING:
+                out[t].append(nxt)
+        for mode, key, idxs, child_visit in inner:
+            nxt = get(key, _MISSING)
+            if nxt is _MISSING:
+                continue
+            if mode == M_DICT:
+                child_visit(nxt, out)
+                continue
+            if not isinstance(nxt, list):
+                continue
+            if mode == M_ALL:
+                for elem in nxt:
+                    child_visit(elem, out)
+            else:  # M_IND
+                n = len(nxt)
+                for r in idxs:
+                    j = r if r >= 0 else n + r
+                    if 0 <= j < n:
+                        child_visit(nxt[j], out)
+    return visit
+
+class PathSet:
+    """
+    多条键路径编译成的前缀树，一次遍历记录取出全部路径的值，公共前缀（尤其是 [] 展开）只走一遍：
+      - get_all(item)                  每条路径命中的值列表，等价于 [get_values_by_key_path(item, p) for p in paths]
+      - get_first(item, default=None)  每条路径第一个命中的值，没有则为 default
+    全部是 .a.b 形式的路径时，逐条直接取值比遍历前缀树更快，此时退化为各路径 KeyPath 的组合。
+    实例本身可调用，等价于 get_all。
+    """
+    __slots__ = ("paths", "_visit", "_n", "_getters")
+
+    def __init__(self, paths: typing.Sequence[str]):
+        self.paths = tuple(paths)
+        self._n = len(self.paths)
+        steps_list = [compile_key_path(p) for p in self.paths]
+        if all(m == M_DICT for steps in steps_list for (m, _, __) in steps):
+            self._getters = tuple(compile_accessor(p).get_first for p in self.paths)
+            self._visit = None
+        else:
+            self._getters = None
+            self._visit = _compile_trie_node(_build_path_trie(steps_list))
+
+    def get_all(self, item: typing.Any) -> List[List[typing.Any]]:
+        if self._getters is not None:
+            return [[] if v is _MISSING else [v] for v in (g(item, _MISSING) for g in self._getters)]
+        out = [[] for _ in range(self._n)]
+        self._visit(item, out)
+        return out
+
+    def get_first(self, item: typing.Any, default: typing.Any = None) -> List[typing.Any]:
+        if self._getters is not None:
+            return [g(item, default) for g in self._getters]
+        return [vals[0] if vals else default for vals in self.get_all(item)]
+
+    def __call__(self, item: typing.Any) -> List[List[typing.Any]]:
+        return self.get_all(item)
+
+    def __repr__(self) -> str:
+        return f"PathSet({list(self.paths)!r})"
+
+@lru_cache(maxsize=256)
+def compile_paths(paths: Tuple[str, ...]) -> PathSet:
+    """
+    将一组路径编译为 PathSet（带缓存，paths 需为 tuple）。
+    """
+    return PathSet(paths)
@@ -10,7 +10,7 @@ import sys
 
 common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../..")
 sys.path.append(common_utils_path)
-from common_utils import read_jsonl, save_jsonl, has_key_path, get_values_by_key_path, run_pipeline, checkpoint_to_file
+from common_utils import read_jsonl, save_jsonl, has_key_path, get_values_by_key_path, compile_accessor, run_pipeline, checkpoint_to_file
 
 import logging
 logger = logging.getLogger(__name__)
@@ -87,19 +87,22 @@ def split_data(samples, test_count, other_count, n_test_part, save_dir, tixing):
 
 # 去除题干或解析为空的数据
 def remove_empty_content_analysis(samples, content_key_path, analysis_key_path):
+    content_acc = compile_accessor(content_key_path)
+    analysis_acc = compile_accessor(analysis_key_path)
     for sample in samples:
-        if not has_key_path(sample, content_key_path):
+        # get_if_exists 在路径不存在时返回 None，判断与取值只遍历一次
+        content = content_acc.get_if_exists(sample)
+        if content is None:
             continue
-        if not has_key_path(sample, analysis_key_path):
+        analysis = analysis_acc.get_if_exists(sample)
+        if analysis is None:
             continue
-        content = get_values_by_key_path(sample, content_key_path)
         if len(content) != 1:
             continue
         if not isinstance(content[0], str):
             continue
         if content[0].strip() == "":
             continue
-        analysis = get_values_by_key_path(sample, analysis_key_path)
         if len(analysis) != 1:
             continue
         if not isinstance(analysis[0], str):
@@ -112,10 +115,13 @@ def remove_empty_content_analysis(samples, content_key_path, analysis_key_path):
 def get_phase1_crawl_in(samples, phase1_prompt_path, id_key_path, content_key_path, analysis_key_path):
     with open(phase1_prompt_path) as reader:
         prompt_template = reader.read().strip()
+    get_id = compile_accessor(id_key_path).get_first
+    get_content = compile_accessor(content_key_path).get_first
+    get_analysis = compile_accessor(analysis_key_path).get_first
     for sample in samples:
-        topic_id = get_values_by_key_path(sample, id_key_path)[0]
-        content = get_values_by_key_path(sample, content_key_path)[0]
-        analysis =  get_values_by_key_path(sample, analysis_key_path)[0]
+        topic_id = get_id(sample)
+        content = get_content(sample)
+        analysis = get_analysis(sample)
         prompt = prompt_template.replace("{{question}}", content).replace("{{analysis}}", analysis)
         yield {"id": topic_id, "query": prompt}
 
@@ -2,6 +2,7 @@ import tqdm
 from pathlib import Path
 import json
 import json_repair
+from functools import partial
 import re
 from checklist import remove_redundant_spaces, fix_continued_equality
 from latex_to_image import latex_to_image
@@ -10,7 +11,7 @@ import sys
 
 common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../..")
 sys.path.append(common_utils_path)
-from common_utils import read_jsonl, save_jsonl, has_key_path, get_values_by_key_path, run_pipeline, checkpoint_to_file
+from common_utils import read_jsonl, save_jsonl, has_key_path, get_values_by_key_path, compile_accessor, compile_paths, run_pipeline, checkpoint_to_file, instrument, parallel_map
 
 import logging
 logger = logging.getLogger(__name__)
@@ -87,19 +88,22 @@ def split_data(samples, test_count, other_count, n_test_part, save_dir, tixing):
 
 # 去除题干或解析为空的数据
 def remove_empty_content_analysis(samples, content_key_path, analysis_key_path):
+    content_acc = compile_accessor(content_key_path)
+    analysis_acc = compile_accessor(analysis_key_path)
     for sample in samples:
-        if not has_key_path(sample, content_key_path):
+        # get_if_exists 在路径不存在时返回 None，判断与取值只遍历一次
+        content = content_acc.get_if_exists(sample)
+        if content is None:
             continue
-        if not has_key_path(sample, analysis_key_path):
+        analysis = analysis_acc.get_if_exists(sample)
+        if analysis is None:
             continue
-        content = get_values_by_key_path(sample, content_key_path)
         if len(content) != 1:
             continue
         if not isinstance(content[0], str):
             continue
         if content[0].strip() == "":
             continue
-        analysis = get_values_by_key_path(sample, analysis_key_path)
         if len(analysis) != 1:
             continue
         if not isinstance(analysis[0], str):
@@ -114,19 +118,19 @@ def get_phase1_crawl_in(samples, phase1_prompt_path, phase1_correct_prompt_path,
         prompt_template = reader.read().strip()
     with open(phase1_correct_prompt_path) as reader:
         correct_prompt_template = reader.read().strip()
+    extract = compile_paths((id_key_path, content_key_path, analysis_key_path)).get_first
     for sample in samples:
-        topic_id = get_values_by_key_path(sample, id_key_path)[0]
-        content = get_values_by_key_path(sample, content_key_path)[0]
-        analysis =  get_values_by_key_path(sample, analysis_key_path)[0]
+        topic_id, content, analysis = extract(sample)
         prompt = prompt_template.replace("{{question}}", content).replace("{{analysis}}", analysis)
         yield {"id": topic_id, "query": [prompt, correct_prompt_template]}
 
 # 解析phase1爬取数据
 def parse_phase1_result(samples, orig_samples, content_key_path, id_key_path):
     id2content = {}
+    extract = compile_paths((content_key_path, id_key_path)).get_first
     for sample in orig_samples:
-        content = get_values_by_key_path(sample, content_key_path)[0].strip()
-        sample_id = get_values_by_key_path(sample, id_key_path)[0].strip()
+        content, sample_id = extract(sample)
+        content, sample_id = content.strip(), sample_id.strip()
         id2content[sample_id] = content
     for sample in samples:
         sample_id = sample["id"]
@@ -162,11 +166,10 @@ def parse_phase2_result(samples_orig, samples_phase1, samples_phase2, content_ke
     id2content = {}
     id2analyse = {}
     id2phase1_answer = {}
+    extract = compile_paths((content_key_path, analyse_key_path, id_key_path)).get_first
     for sample in samples_orig:
         # print(json.dumps(sample, ensure_ascii=False, indent=2))
-        content = get_values_by_key_path(sample, content_key_path)[0].strip()
-        analyse = get_values_by_key_path(sample, analyse_key_path)[0].strip()
-        sample_id = get_values_by_key_path(sample, id_key_path)[0].strip()
+        content, analyse, sample_id = (v.strip() for v in extract(sample))
         id2content[sample_id] = content
         id2analyse[sample_id] = analyse
     for sample in samples_phase1:
@@ -398,22 +401,31 @@ def pipeline_phase2_crawl_input(orig_split_data_path, phase1_crawl_out_path, pha
     samples = get_phase2_crawl_in(samples, phase2_prompt_path, phase2_correct_prompt_path)
     yield from samples
 
+def check_and_to_manim_format(samples, html_template_path):
+    """check_list -> to_manim_format，作为 parallel_map 的分块处理函数（json_repair 等 CPU 密集处理放到子进程）"""
+    yield from to_manim_format(check_list(samples), html_template_path)
+
 @checkpoint_to_file
-def pipeline_to_manim_format(orig_split_data_path, phase1_answer_path, phase2_answer_path, id_key_path, content_key_path, analysis_key_path, html_template_path):
+def pipeline_to_manim_format(orig_split_data_path, phase1_answer_path, phase2_answer_path, id_key_path, content_key_path, analysis_key_path, html_template_path, workers=1):
     """
     阶段1：生成爬取输入
     读取 -> 过滤空视频 -> 格式化 -> 生成Prompt
     """
+    # instrument 只在 run_pipeline(profile=True) 时统计各层耗时，平时原样透传
     samples_orig = read_jsonl(orig_split_data_path)
     samples_orig = remove_empty_content_analysis(samples_orig, content_key_path, analysis_key_path)
-    samples_phase1 = read_jsonl(phase1_answer_path)
-    samples_phase1 = parse_phase1_result(samples_phase1, samples_orig, content_key_path, id_key_path)
-    samples_phase2 = read_jsonl(phase2_answer_path)
+    samples_phase1 = instrument(read_jsonl(phase1_answer_path), "read_phase1")
+    samples_phase1 = instrument(parse_phase1_result(samples_phase1, samples_orig, content_key_path, id_key_path))
+    samples_phase2 = instrument(read_jsonl(phase2_answer_path), "read_phase2")
     samples_orig = read_jsonl(orig_split_data_path)  # NOTE samples_orig被消费了，需要重新再生成一遍
-    samples_orig = remove_empty_content_analysis(samples_orig, content_key_path, analysis_key_path)
-    samples = parse_phase2_result(samples_orig, samples_phase1, samples_phase2, content_key_path, analysis_key_path, id_key_path)
-    samples = check_list(samples)
-    samples = to_manim_format(samples, html_template_path)
+    samples_orig = instrument(remove_empty_content_analysis(samples_orig, content_key_path, analysis_key_path))
+    samples = instrument(parse_phase2_result(samples_orig, samples_phase1, samples_phase2, content_key_path, analysis_key_path, id_key_path))
+    if workers > 1:
+        samples = instrument(parallel_map(partial(check_and_to_manim_format, html_template_path=html_template_path), samples,
+                                          workers=workers, chunksize=64, batched=True))
+    else:
+        samples = instrument(check_list(samples))
+        samples = instrument(to_manim_format(samples, html_template_path))
     yield from samples
 
 
@@ -435,6 +447,8 @@ if __name__ == "__main__":
     parser.add_argument("--phase2_prompt_version", type=str, default="v2")
     parser.add_argument("--html_template_path", type=str, default="/mnt/pan8T/temp_djguo/dataprocessor/projects/图形化讲解/小数单模-立体几何/代码/htmlTemplate.html")
     parser.add_argument("--rendered_ids_path", type=str)
+    parser.add_argument("--workers", type=int, default=1, help="转Manim格式阶段 check_list / to_manim_format 的进程数")
+    parser.add_argument("--profile", action="store_true", help="统计各层耗时与内存，报告保存在输出文件旁的隐藏文件 .xxx.json.profile.json")
     args = parser.parse_args()
 
     orig_data_paths = [
@@ -528,6 +542,9 @@ if __name__ == "__main__":
                 id_key_path=args.id_key_path, 
                 content_key_path=args.content_key_path, 
                 analysis_key_path=args.analysis_key_path, 
-                html_template_path=args.html_template_path
-            )
+                html_template_path=args.html_template_path,
+                workers=args.workers
+            ),
+            profile=args.profile,
+            report_path=Path(manim_save_path).with_name(f".{Path(manim_save_path).name}.profile.json").as_posix() if args.profile else None
         )
\ No newline at end of file
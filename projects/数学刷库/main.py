@@ -1,7 +1,9 @@
 """
 数学单模视频清洗 (Refactored with checkpoint_to_file)
 """
+import itertools
 import json
+from functools import partial
 import re
 import argparse
 from pathlib import Path
@@ -16,7 +18,7 @@ common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..
 sys.path.append(common_utils_path)
 
 # 引入你的工具库
-from common_utils import read_jsonl, get_values_by_key_path, checkpoint_to_file, run_pipeline
+from common_utils import read_jsonl, get_values_by_key_path, compile_accessor, checkpoint_to_file, run_pipeline, json_text_fragments, instrument, parallel_map, async_map
 
 import logging
 logger = logging.getLogger(__name__)
@@ -58,8 +60,9 @@ def filter_empty_video(samples, tran_script_key, phase):
 
 def format_input(samples, tran_script_key, phase):
     """将原始数据格式化为待处理格式"""
+    get_tran_script = compile_accessor(tran_script_key).get_first
     for sample in samples:
-        tran_script = get_values_by_key_path(sample, tran_script_key)[0]
+        tran_script = get_tran_script(sample)
         if isinstance(tran_script, str):
             tran_script = json.loads(tran_script)
             
@@ -161,64 +164,70 @@ def safe_post_request(url, payload, max_attempts=5):
                 print(f"Request failed: {e}")
     return None
 
-def filter_latex_logic(samples):
-    """Latex 过滤逻辑"""
+def check_latex(sample):
+    """单条 Latex 检查：不合格时返回过滤结果，合格（或无需检查）时返回 None"""
     url = "http://localhost:3000/latex2html"
-    for sample in samples:
-        assert "id" in sample
-        is_latex_good = True
-        question = sample["video_question"]
-        video = sample["video"]
-        video_display = [question]
+    assert "id" in sample
+    is_latex_good = True
+    question = sample["video_question"]
+    video = sample["video"]
+    video_display = [question]
+    
+    for k in video:
+        content = video[k].get("展示内容", "")
+        if isinstance(content, dict):
+            video_display.extend(list(content.keys()))
+        elif isinstance(content, list):
+            video_display.extend(content)
+        elif isinstance(content, str):
+            video_display.append(content)
+
+    # 简单的清洗和检查
+    processed_display = []
+    for c in video_display:
+        if not isinstance(c, str): continue
+        # 简单的替换逻辑 (保留原来的)
+        c = c.replace("\tau", "\\tau").replace("\triangle", "\\triangle") \
+             .replace("\times", "\\times").replace("\therefore", "\\therefore") \
+             .replace("\text", "\\text").replace("\neg", "\\neg") \
+             .replace("\neq", "\\neq").replace("\nabl", "\\nabl") \
+             .replace("\newline", "\\newline").replace("\t", "").replace("\n", "").replace("\"", "'")
         
-        for k in video:
-            content = video[k].get("展示内容", "")
-            if isinstance(content, dict):
-                video_display.extend(list(content.keys()))
-            elif isinstance(content, list):
-                video_display.extend(content)
-            elif isinstance(content, str):
-                video_display.append(content)
-
-        # 简单的清洗和检查
-        processed_display = []
-        for c in video_display:
-            if not isinstance(c, str): continue
-            # 简单的替换逻辑 (保留原来的)
-            c = c.replace("\tau", "\\tau").replace("\triangle", "\\triangle") \
-                 .replace("\times", "\\times").replace("\therefore", "\\therefore") \
-                 .replace("\text", "\\text").replace("\neg", "\\neg") \
-                 .replace("\neq", "\\neq").replace("\nabl", "\\nabl") \
-                 .replace("\newline", "\\newline").replace("\t", "").replace("\n", "").replace("\"", "'")
-            
-            c_dump = json.dumps(c, ensure_ascii=False)
-            if ("\\" in c_dump or "^" in c_dump) and "$" not in c:
-                is_latex_good = False
-                break
-            processed_display.append(c)
-
-        if not is_latex_good:
-            yield {"topic_id": sample["id"], "tran_script_version": "单模视频latex过滤", "tran_script_operate_type": "null"}
-            continue
-            
-        video_display_str = "\n".join(processed_display)
-        if re.search(r'[a-zA-Z]', video_display_str) is None:
-            continue
-            
-        payload = {"text": video_display_str}
-        response = safe_post_request(url, payload)
+        c_dump = json.dumps(c, ensure_ascii=False)
+        if ("\\" in c_dump or "^" in c_dump) and "$" not in c:
+            is_latex_good = False
+            break
+        processed_display.append(c)
+
+    if not is_latex_good:
+        return {"topic_id": sample["id"], "tran_script_version": "单模视频latex过滤", "tran_script_operate_type": "null"}
         
-        if response and response.status_code == 200:
-            data = response.json()
-            if data.get("code") != 200:
-                is_latex_good = False
-        else:
-             # 如果服务不通，策略是保留还是过滤？此处保持原逻辑(认为是坏的?)
-             # 原逻辑里如果未响应似乎没有置为False，这里需注意
-             pass 
+    video_display_str = "\n".join(processed_display)
+    if re.search(r'[a-zA-Z]', video_display_str) is None:
+        return None
+        
+    payload = {"text": video_display_str}
+    response = safe_post_request(url, payload)
+    
+    if response and response.status_code == 200:
+        data = response.json()
+        if data.get("code") != 200:
+            is_latex_good = False
+    else:
+         # 如果服务不通，策略是保留还是过滤？此处保持原逻辑(认为是坏的?)
+         # 原逻辑里如果未响应似乎没有置为False，这里需注意
+         pass 
+
+    if not is_latex_good:
+        return {"topic_id": sample["id"], "tran_script_version": "单模视频latex过滤", "tran_script_operate_type": "null"}
+    return None
 
-        if not is_latex_good:
-            yield {"topic_id": sample["id"], "tran_script_version": "单模视频latex过滤", "tran_script_operate_type": "null"}
+def filter_latex_logic(samples):
+    """Latex 过滤逻辑"""
+    for sample in samples:
+        result = check_latex(sample)
+        if result is not None:
+            yield result
 
 def filter_analysis_logic(samples):
     for sample in samples:
@@ -247,16 +256,22 @@ def filter_all_logic(samples_orig, samples_video, samples_analysis, samples_late
 
 # ==================== 核心修改：Pipeline 函数 (使用 @checkpoint_to_file) ====================
 
+def build_crawl_in(samples, tran_script_key, phase, prompt_path):
+    """过滤空视频 -> 格式化 -> 生成Prompt，作为 parallel_map 的分块处理函数"""
+    samples = filter_empty_video(samples, tran_script_key, phase)
+    samples = format_input(samples, tran_script_key, phase)
+    yield from to_crawl_in(samples, prompt_path)
+
 @checkpoint_to_file
-def pipeline_crawl_input(orig_data_path, tran_script_key, phase, prompt_path):
+def pipeline_crawl_input(orig_data_path, tran_script_key, phase, prompt_path, workers=1):
     """
     阶段1：生成爬取输入
     读取 -> 过滤空视频 -> 格式化 -> 生成Prompt
+    workers > 1 时逐稿解析 tranScript、拼接 Prompt 的部分分块交给多进程，输出顺序不变
     """
     samples = read_init_data(orig_data_path)
-    samples = filter_empty_video(samples, tran_script_key, phase)
-    samples = format_input(samples, tran_script_key, phase)
-    yield from to_crawl_in(samples, prompt_path)
+    yield from parallel_map(partial(build_crawl_in, tran_script_key=tran_script_key, phase=phase, prompt_path=prompt_path),
+                            samples, workers=workers, chunksize=256, batched=True)
 
 @checkpoint_to_file
 def pipeline_crawl_output_filter(crawl_out_path):
@@ -264,28 +279,36 @@ def pipeline_crawl_output_filter(crawl_out_path):
     阶段2：处理爬取输出
     读取爬虫结果 -> 过滤不合格
     """
-    # 这里直接读文件即可，read_jsonl在common_utils里
-    samples = read_jsonl(crawl_out_path) 
+    # 绝大多数行是合格的，先按原始行过滤掉不含 "不合格" 标记的行，filter_video_logic 再精确判断
+    samples = read_jsonl(crawl_out_path, prefilter=json_text_fragments('"审核结果": "不合格"'))
     yield from filter_video_logic(samples)
 
 @checkpoint_to_file
-def pipeline_latex_filter(orig_data_path, tran_script_key, phase):
+def pipeline_latex_filter(orig_data_path, tran_script_key, phase, cursor=None, concurrency=8):
     """
     阶段3：Latex 过滤
     读取 -> 格式化 -> 请求服务过滤
+    逐条请求 latex 服务，耗时长：用 async_map 并发请求，并用 mode="resume" 运行，中断后重跑会跳过已处理的记录。
+    async_map 会预读输入，所以 cursor 计的是已交出的检查结果条数（与格式化后的记录一一对应），
+    续跑时在格式化后的数据上跳过这么多条，不再重复请求服务
     """
     samples = read_init_data(orig_data_path)
     samples = filter_empty_video(samples, tran_script_key, phase)
     samples = format_input(samples, tran_script_key, phase)
-    yield from filter_latex_logic(samples)
+    samples = itertools.islice(samples, cursor.start, None)
+    # safe_post_request 自带重试，这里不再重试
+    results = async_map(check_latex, samples, concurrency=concurrency)
+    for result in cursor.track(results, skipped=True):
+        if result is not None:
+            yield result
 
 @checkpoint_to_file
 def pipeline_analysis_filter(analysis_result_paths):
     """
     阶段4：解析过滤继承
     """
-    # 支持多个路径pattern
-    samples = read_jsonl(analysis_result_paths)
+    # 支持多个路径pattern；只用到 topic_id / analysis_operate_type，只解码这两个字段
+    samples = read_jsonl(analysis_result_paths, fields=[".topic_id", ".analysis_operate_type"])
     yield from filter_analysis_logic(samples)
 
 @checkpoint_to_file
@@ -294,16 +317,16 @@ def pipeline_combine_all(orig_data_path, video_res_path, analysis_res_path, late
     阶段5：综合所有结果
     注意：这里需要把前面步骤生成的文件读进来
     """
-    # 1. 原始数据 (作为基准流)
-    samples_orig = read_init_data(orig_data_path)
+    # 1. 原始数据 (作为基准流)；instrument 只在 run_pipeline(profile=True) 时统计耗时
+    samples_orig = instrument(read_init_data(orig_data_path))
     
     # 2. 读取各阶段的中间结果 (List化以便查找，如果数据量巨大需优化逻辑)
     # 因为要构建 id2result 字典，必须先加载到内存
-    samples_video = list(read_jsonl(video_res_path))
-    samples_analysis = list(read_jsonl(analysis_res_path))
-    samples_latex = list(read_jsonl(latex_res_path))
+    samples_video = list(instrument(read_jsonl(video_res_path), "read_video_res"))
+    samples_analysis = list(instrument(read_jsonl(analysis_res_path), "read_analysis_res"))
+    samples_latex = list(instrument(read_jsonl(latex_res_path), "read_latex_res"))
     
-    yield from filter_all_logic(samples_orig, samples_video, samples_analysis, samples_latex)
+    yield from instrument(filter_all_logic(samples_orig, samples_video, samples_analysis, samples_latex))
 
 
 # ==================== Main ====================
@@ -325,6 +348,9 @@ if __name__ == "__main__":
     parser.add_argument("--orig_data_path", type=str)
     # 支持 list 参数
     parser.add_argument("--analysis_result_path", type=str, nargs="+")
+    parser.add_argument("--workers", type=int, default=1, help="保存爬取输入阶段的进程数")
+    parser.add_argument("--latex_concurrency", type=int, default=8, help="latex过滤结果阶段并发请求 latex 服务的数量（改动后该阶段的续跑进度会作废，从头执行）")
+    parser.add_argument("--profile", action="store_true", help="统计各层耗时与内存，报告保存在输出文件旁的隐藏文件 .xxx.json.profile.json")
     
     args = parser.parse_args()
     # 打印参数
@@ -361,7 +387,8 @@ if __name__ == "__main__":
                 orig_data_path=args.orig_data_path,
                 tran_script_key=args.tran_script_key,
                 phase=args.phase,
-                prompt_path=args.prompt_path
+                prompt_path=args.prompt_path,
+                workers=args.workers
             )
         )
 
@@ -382,11 +409,12 @@ if __name__ == "__main__":
         run_pipeline(
             pipeline_latex_filter(
                 save_path=path_latex_res,
-                mode="write"
+                mode="resume"
             )(
                 orig_data_path=args.orig_data_path,
                 tran_script_key=args.tran_script_key,
-                phase=args.phase
+                phase=args.phase,
+                concurrency=args.latex_concurrency
             )
        )
     elif args.stage == "解析过滤结果":
@@ -412,5 +440,7 @@ if __name__ == "__main__":
                 video_res_path=path_video_res,
                 analysis_res_path=path_analysis_res,
                 latex_res_path=path_latex_res
-            )
+            ),
+            profile=args.profile,
+            report_path=Path(path_final_res).with_name(f".{Path(path_final_res).name}.profile.json").as_posix() if args.profile else None
         )
\ No newline at end of file
@@ -19,7 +19,7 @@ common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..
 sys.path.append(common_utils_path)
 
 # 引入你的工具库
-from common_utils import read_jsonl, get_values_by_key_path, checkpoint_to_file, run_pipeline
+from common_utils import read_jsonl, get_values_by_key_path, compile_accessor, checkpoint_to_file, run_pipeline
 
 import logging
 logger = logging.getLogger(__name__)
@@ -87,8 +87,9 @@ def filter_empty_video(samples, tran_script_key, phase):
 
 def format_input(samples, tran_script_key, phase):
     """将原始数据格式化为待处理格式"""
+    get_tran_script = compile_accessor(tran_script_key).get_first
     for sample in samples:
-        tran_script = get_values_by_key_path(sample, tran_script_key)[0]
+        tran_script = get_tran_script(sample)
         if isinstance(tran_script, str):
             tran_script = json.loads(tran_script)
             
@@ -385,8 +386,8 @@ if __name__ == "__main__":
         for q_type in ["same", "update", "delete"]:
             for a_type in ["same", "update", "null"]:
                 samples_orig = read_jsonl(orig_data_path)
-                samples_question_result = read_jsonl(question_result_path)
-                samples_analysis_result = read_jsonl(analysis_result_path)
+                samples_question_result = read_jsonl(question_result_path, fields=[".topic_id", ".content_available_operate_type"])
+                samples_analysis_result = read_jsonl(analysis_result_path, fields=[".topic_id", ".analysis_operate_type"])
                 samples = get_specific_data_ids(samples_orig, samples_question_result, samples_analysis_result, q_type, a_type)
                 logger.info(f"-"*50)
                 logger.info(f"题干操作类型: {q_type}")
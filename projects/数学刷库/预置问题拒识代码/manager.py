@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
+import sys
+import glob
 import time
 import json
 import re
@@ -10,6 +12,11 @@ import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Tuple, Union, Optional, Any, Set
 
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../..")
+sys.path.append(common_utils_path)
+
+from common_utils import read_jsonl
+
 FilePath = Union[str, os.PathLike]
 MetricType = Dict[str, Union[int, float, str]]
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(module)s:%(lineno)d - %(levelname)s: %(message)s")
@@ -1331,6 +1338,15 @@ class PresetQuestionManager:
                 json.dump(state_dict, fp, ensure_ascii=False)
             logger.info(f"空状态文件已保存至 {null_state_file}")
 
+    @staticmethod
+    def _read_script_null(script_file: FilePath, state_key: str):
+        # 状态为 "null" 的行原始文本里一定有 "null" 字面量，绝大多数行不含它，解码前按原始行过滤掉；
+        # 其他字段恰好是 "null" 的误放由 where 剔除，只解码 topic_id 与状态两个字段。
+        # read_jsonl 按 glob 展开路径，文件名里的 [ ] * ? 需要转义，否则匹配不到或匹配到别的文件
+        return read_jsonl(glob.escape(str(script_file)), prefilter=b'"null"',
+                          fields=[".topic_id", f".{state_key}"],
+                          where=lambda line: line[state_key] == "null")
+
     def get_script_null_state(self, script_dir, state_key: str = "tran_script_operate_type"):
         logger.info(f"获取脚本空状态样本数：{script_dir}")
         script_state_dict = set()
@@ -1341,23 +1357,15 @@ class PresetQuestionManager:
                         line = line.strip()
                         script_state_dict.add(line)
             else:
-                with open(script_dir, "r", encoding="utf-8") as fp:
-                    for line in fp:
-                        line = json.loads(line)
-                        script_operate_type = line[state_key]
-                        if script_operate_type == "null":
-                            script_state_dict.add(line["topic_id"])   
+                for line in self._read_script_null(script_dir, state_key):
+                    script_state_dict.add(line["topic_id"])
         else:
             for root, _, files in os.walk(script_dir):
                 for file in files:
                     logger.info(f"处理文件：{file}")
                     script_file = os.path.join(root, file)
-                    with open(script_file, "r", encoding="utf-8") as fp:
-                        for line in fp:
-                            line = json.loads(line)
-                            script_operate_type = line[state_key]
-                            if script_operate_type == "null":
-                                script_state_dict.add(line["topic_id"])
+                    for line in self._read_script_null(script_file, state_key):
+                        script_state_dict.add(line["topic_id"])
                     logger.info(f"{file}获取空状态样本数：{len(script_state_dict)}")
         
         script_null_count = len(script_state_dict)
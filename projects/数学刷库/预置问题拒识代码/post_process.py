@@ -1,6 +1,6 @@
 import os
+import re
 import sys
-from functools import reduce
 import tqdm
 import json
 from pathlib import Path
@@ -14,26 +14,21 @@ from common_utils import read_jsonl, read_json
 
 def get_result(orig_data_path, orig_null_path, latex_null_path, video_check_path, preset_question_result_path, save_result_path):
     samples_orig = read_jsonl(orig_data_path)
-    samples_orig_null = list(read_json(orig_null_path))
-    samples_orig_null = reduce(lambda x, y: x | y, samples_orig_null)
-    samples_orig_null = set(samples_orig_null.keys())
+    # 结果文件是 topic_id 为键的大字典，流式读取只保留需要的部分
+    samples_orig_null = set(sample_id for sample_id, _ in read_json(orig_null_path, stream=True))
     print(len(samples_orig_null))
-    samples_latex_null = list(read_json(latex_null_path))
-    samples_latex_null = reduce(lambda x, y: x | y, samples_latex_null)
-    samples_latex_null = set(samples_latex_null.keys())
+    samples_latex_null = set(sample_id for sample_id, _ in read_json(latex_null_path, stream=True))
     print(len(samples_latex_null))
-    samples_video_check_null = read_jsonl(video_check_path)
+    samples_video_check_null = read_jsonl(video_check_path, prefilter=re.compile(rb'"tran_script_operate_type"\s*:\s*"null"'))
     samples_video_check_null = set([x["topic_id"] for x in samples_video_check_null if x["tran_script_operate_type"]=="null"])
     print(len(samples_video_check_null))
 
-    samples_preset_question_result = list(read_json(preset_question_result_path))
-    samples_preset_question_result = reduce(lambda x, y: x | y, samples_preset_question_result)
     id2question_keep = {}
-    for sample_id in samples_preset_question_result:
-        if samples_preset_question_result[sample_id] is None:
+    for sample_id, question_result in read_json(preset_question_result_path, stream=True):
+        if question_result is None:
             id2question_keep[sample_id] = []
         else:
-            id2question_keep[sample_id] = [samples_preset_question_result[sample_id][_]["content"] for _ in samples_preset_question_result[sample_id]]
+            id2question_keep[sample_id] = [question_result[_]["content"] for _ in question_result]
     print(len(id2question_keep))
     Path(save_result_path).parent.mkdir(exist_ok=True, parents=True)
     with open(save_result_path, "w") as writer:
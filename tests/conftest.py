@@ -0,0 +1,5 @@
+import os
+import sys
+
+common_utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, common_utils_path)
@@ -0,0 +1,165 @@
+"""
+async_map 对本地 http.server 桩服务的行为：顺序、超时、重试退避、on_error、提前关闭。
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from common_utils import async_map
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    GET /?i=3&delay=0.05&fail=2：等待 delay 秒；同一个 i 的前 fail 次请求返回 503，之后返回 {"i": i}。
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        i = int(query["i"])
+        server = self.server
+        with server.lock:
+            server.hits[i] += 1
+            attempt = server.hits[i]
+        time.sleep(float(query.get("delay", 0)))
+        if attempt <= int(query.get("fail", 0)):
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"i": i}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.hits = Counter()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(server, **params):
+    """
+    返回 fn(i)：带上 params 请求桩服务，params 的值可以是 i -> 值 的函数。
+    """
+    base = f"http://127.0.0.1:{server.server_port}/"
+
+    def fetch(i):
+        query = {"i": i}
+        for k, v in params.items():
+            query[k] = v(i) if callable(v) else v
+        url = base + "?" + "&".join(f"{k}={v}" for k, v in query.items())
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return json.loads(response.read())["i"]
+    return fetch
+
+
+def _loop_threads():
+    return [t for t in threading.enumerate() if t.name == "async_map-loop"]
+
+
+def test_results_keep_input_order(stub):
+    rng = random.Random(0)
+    delays = [rng.uniform(0, 0.05) for _ in range(60)]
+    fetch = _client(stub, delay=lambda i: delays[i])
+    t0 = time.perf_counter()
+    assert list(async_map(fetch, range(60), concurrency=12)) == list(range(60))
+    # 串行需要 sum(delays) ≈ 1.5s
+    assert time.perf_counter() - t0 < sum(delays) / 2
+
+
+def test_async_fn_keeps_input_order():
+    async def double(x):
+        await asyncio.sleep(random.random() * 0.01)
+        return x * 2
+    assert list(async_map(double, range(200), concurrency=50)) == [x * 2 for x in range(200)]
+
+
+def test_timeout_counts_as_failure(stub):
+    fetch = _client(stub, delay=lambda i: 1.0 if i == 3 else 0)
+    t0 = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        list(async_map(fetch, range(6), concurrency=2, timeout=0.2))
+    assert time.perf_counter() - t0 < 1.0
+    assert list(async_map(fetch, range(6), concurrency=2, timeout=0.2, on_error="skip")) == [0, 1, 2, 4, 5]
+
+
+def test_retries_with_backoff(stub):
+    fetch = _client(stub, fail=2)
+    t0 = time.perf_counter()
+    assert list(async_map(fetch, range(10), concurrency=10, retries=2, backoff=0.1)) == list(range(10))
+    # 两次重试前至少各等待 backoff * 2^k * 0.5
+    assert time.perf_counter() - t0 >= 0.1 * 0.5 + 0.2 * 0.5
+    assert all(stub.hits[i] == 3 for i in range(10))
+
+
+def test_retries_exhausted_raises(stub):
+    fetch = _client(stub, fail=3)
+    with pytest.raises(urllib.error.HTTPError):
+        list(async_map(fetch, range(4), concurrency=4, retries=1, backoff=0.01))
+    # 第一条失败即抛出，其余记录的调用会被取消，只检查它的请求次数
+    assert stub.hits[0] == 2
+
+
+def test_retry_on_filters_exceptions(stub):
+    fetch = _client(stub, fail=1)
+    with pytest.raises(urllib.error.HTTPError):
+        list(async_map(fetch, range(3), retries=3, backoff=0.01, retry_on=(asyncio.TimeoutError,)))
+    assert all(stub.hits[i] == 1 for i in range(3))
+
+
+def test_on_error_raise_yields_results_before_failure(stub):
+    fetch = _client(stub, fail=lambda i: 1 if i == 5 else 0)
+    out = []
+    with pytest.raises(urllib.error.HTTPError):
+        for value in async_map(fetch, range(10), concurrency=3):
+            out.append(value)
+    assert out == [0, 1, 2, 3, 4]
+
+
+def test_on_error_skip_drops_failed_records(stub, caplog):
+    fetch = _client(stub, fail=lambda i: 1 if i % 4 == 1 else 0)
+    with caplog.at_level("WARNING", logger="common_utils.parallel"):
+        out = list(async_map(fetch, range(12), concurrency=3, on_error="skip"))
+    assert out == [i for i in range(12) if i % 4 != 1]
+    assert sum("已跳过" in r.getMessage() for r in caplog.records) == 3
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        list(async_map(str, range(3), concurrency=0))
+    with pytest.raises(ValueError):
+        list(async_map(str, range(3), on_error="ignore"))
+
+
+def test_early_close_stops_background_loop(stub):
+    fetch = _client(stub, delay=0.02)
+    gen = async_map(fetch, range(10 ** 6), concurrency=4, max_in_flight=8)
+    assert [next(gen), next(gen)] == [0, 1]
+    assert len(_loop_threads()) == 1
+    gen.close()
+    assert _loop_threads() == []
+    # 关闭后不再读取输入、发出新请求
+    time.sleep(0.1)
+    requested = sum(stub.hits.values())
+    time.sleep(0.2)
+    assert sum(stub.hits.values()) == requested <= 8 + 4
@@ -0,0 +1,51 @@
+"""
+JsonlWriter(fsync=True)：压缩分片的 gzip 尾部 / zstd frame 结尾必须在 fsync 之前写入底层文件。
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+import common_utils.io as cu_io
+from common_utils import JsonlWriter, read_jsonl
+
+
+@pytest.fixture
+def fsync_sizes(monkeypatch):
+    """
+    记录每次 fsync 时文件的大小（目录 fsync 也会记录，按 inode 区分）。
+    """
+    sizes = {}
+    real_fsync = os.fsync
+
+    def fake_fsync(fd):
+        st = os.fstat(fd)
+        sizes[st.st_ino] = st.st_size
+        real_fsync(fd)
+    monkeypatch.setattr(cu_io.os, "fsync", fake_fsync)
+    return sizes
+
+
+def _records(n):
+    return [{"topic_id": str(i), "text": "题干" * (i % 7), "n": i} for i in range(n)]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".json.gz", ".json.zst", ".frames.gz"])
+def test_fsync_covers_compressed_trailer(tmp_path, fsync_sizes, suffix):
+    if suffix.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    records = _records(1000)
+    with JsonlWriter(str(tmp_path / f"out{suffix}"), fsync=True, shard_records=400) as writer:
+        writer.write_many(records)
+    manifest = writer.manifest
+    assert [m["count"] for m in manifest] == [400, 400, 200]
+
+    for m in manifest:
+        st = os.stat(m["path"])
+        # 发布的文件在 fsync 时就已经是完整大小
+        assert fsync_sizes[st.st_ino] == st.st_size
+    if suffix == ".json.gz":
+        lines = b"".join(gzip.decompress(open(m["path"], "rb").read()) for m in manifest).splitlines()
+        assert [json.loads(line) for line in lines] == records
+    assert list(read_jsonl(str(tmp_path / f"out_part*{suffix}"))) == records
@@ -0,0 +1,104 @@
+"""
+read_json(stream=True) 在小 chunk_size 下的正确性：数字、字面量被切在块边界时不能提前结束。
+"""
+import json
+import random
+
+import pytest
+
+import common_utils.io as cu_io
+from common_utils import read_json
+
+NUMBER_HEAVY = [
+    [1.5e10, 3],
+    [-0.25, 1e-7, 12345678901234567890, 0, -0, 3.0E+2],
+    [True, False, None, 10, 2.5],
+    {"a": 1.25e3, "bb": [-1, 2e2, {"c": 0.5}], "d": None, "e": -12.5E-3},
+]
+
+
+def _random_doc(rng: random.Random):
+    def scalar():
+        return rng.choice([
+            rng.randint(-10 ** 20, 10 ** 20),
+            rng.uniform(-1e6, 1e6),
+            rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30),
+            True, False, None,
+            "s" * rng.randint(0, 4),
+            "长\"串\\\n\u00e9" * rng.randint(1, 6),
+        ])
+    items = [scalar() if rng.random() < 0.8 else [scalar(), {"k": scalar()}] for _ in range(rng.randint(0, 12))]
+    if rng.random() < 0.5:
+        return items
+    return {f"k{i}": v for i, v in enumerate(items)}
+
+
+def _stream(path, doc_text, chunk_size):
+    path.write_text(doc_text, encoding="utf-8")
+    return list(read_json(str(path), stream=True, chunk_size=chunk_size))
+
+
+def _expected(doc_text):
+    doc = json.loads(doc_text)
+    return list(doc.items()) if isinstance(doc, dict) else doc
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+@pytest.mark.parametrize("doc", NUMBER_HEAVY)
+def test_stream_numbers_split_at_chunk_boundary(tmp_path, doc, chunk_size):
+    for text in (json.dumps(doc), json.dumps(doc, indent=2)):
+        assert _stream(tmp_path / "doc.json", text, chunk_size) == _expected(text)
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+def test_stream_random_documents_match_json_load(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    for _ in range(50):
+        text = json.dumps(_random_doc(rng), separators=rng.choice([(",", ":"), (", ", ": ")]))
+        assert _stream(tmp_path / "doc.json", text, chunk_size) == _expected(text)
+
+
+def test_stream_error_after_partial_output_raises(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text("[1, 2, {oops}]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(read_json(str(path), stream=True, chunk_size=4))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8, 64])
+def test_stream_long_strings_spanning_chunks(tmp_path, chunk_size):
+    doc = {"k": "x" * 500 + "\\\"\u4e2d\n" * 50, "list": ["\U0001f600" * 20, "y" * 300, -1.5e-3]}
+    for ensure_ascii in (True, False):
+        text = json.dumps(doc, ensure_ascii=ensure_ascii)
+        assert _stream(tmp_path / "doc.json", text, chunk_size) == _expected(text)
+
+
+def test_stream_syntax_error_does_not_buffer_rest_of_file(tmp_path, monkeypatch):
+    path = tmp_path / "bad.json"
+    good = json.dumps({"topic_id": "x" * 20, "score": 1.5})
+    path.write_text("[" + good + ", {oops: 1}, " + ", ".join([good] * 20000) + "]", encoding="utf-8")
+    total = path.stat().st_size
+
+    read_chars = []
+    real_open_text = cu_io.open_text
+
+    class _Counting:
+        def __init__(self, reader):
+            self._reader = reader
+
+        def read(self, size=-1):
+            chunk = self._reader.read(size)
+            read_chars.append(len(chunk))
+            return chunk
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._reader.close()
+
+    monkeypatch.setattr(cu_io, "open_text", lambda p, *a, **kw: _Counting(real_open_text(p, *a, **kw)))
+    with pytest.raises(ValueError):
+        list(read_json(str(path), stream=True, chunk_size=256))
+    # 出错时只读到错误附近，不会把剩下的 ~1MB 读进缓冲区
+    assert sum(read_chars) < 4096 < total